@@ -3,16 +3,31 @@
 #----------------------------------------------------------------------------#
 
 import json
+import logging
+import os
+import time
 import dateutil.parser
 import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+import babel.dates
+import click
+from functools import lru_cache, wraps
+from itertools import groupby
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, jsonify, stream_with_context, g, session, has_request_context
 from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
 from flask_migrate import Migrate
 from logging import Formatter, FileHandler
 from flask_wtf import FlaskForm as Form, CsrfProtect
+from sqlalchemy import orm
 from sqlalchemy.orm import backref
+from sqlalchemy.ext.asyncio import create_async_engine
 from forms import *
+from pagination import keyset_page
+from cache import LRUCache, cached_page
+from compress import CompressionMiddleware
+from assets import asset_urls, build_assets, brotli, send_built_asset
+from conditional import conditional
+from metrics import RequestMetrics, query_budget
 
 #----------------------------------------------------------------------------#
 # App Config.
@@ -22,11 +37,62 @@ app = Flask(__name__)
 csrf = CsrfProtect(app)
 moment = Moment(app)
 app.config.from_object('config')
+if not app.config['SECRET_KEY']:
+  app.logger.warning('FYYUR_SECRET_KEY is not set: using a random key, which other worker '
+    'processes will not accept session cookies (CSRF tokens, replica stickiness) from.')
+  app.config['SECRET_KEY'] = os.urandom(32)
 
 # [Done] TODO: connect to a local postgresql database
 
-db = SQLAlchemy(app)
+class RoutingSession(SignallingSession):
+  # Sends the queries of @read_only views to the 'replica' bind; flushes and
+  # every other view stay on the primary.
+  def get_bind(self, mapper=None, clause=None):
+    if has_request_context() and g.get('read_replica') and not self._flushing:
+      return db.get_engine(self.app, bind='replica')
+    return super().get_bind(mapper, clause)
+
+ASYNCIO_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+class RoutingSQLAlchemy(SQLAlchemy):
+  def create_session(self, options):
+    return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+  def create_engine(self, sa_url, engine_opts):
+    if sa_url.drivername.startswith('sqlite'):
+      # SQLite gets a static or null pool, neither of which takes sizing.
+      engine_opts = {key: value for key, value in engine_opts.items()
+        if key not in ('pool_size', 'max_overflow', 'pool_timeout')}
+    if app.config['SQLALCHEMY_ASYNCIO']:
+      # Served by asgi.py: an asyncio driver underneath the usual sync API,
+      # so a request waiting on the database hands the event loop to others.
+      sa_url = sa_url.set(drivername=ASYNCIO_DRIVERS[sa_url.get_backend_name()])
+      return create_async_engine(sa_url, **engine_opts).sync_engine
+    return super().create_engine(sa_url, engine_opts)
+
+db = RoutingSQLAlchemy(app)
 migrate = Migrate(app, db)
+metrics = RequestMetrics(app)
+app.wsgi_app = CompressionMiddleware(
+  app.wsgi_app, min_size=app.config['COMPRESS_MIN_SIZE'], mimetypes=app.config['COMPRESS_MIMETYPES'],
+  level=app.config['COMPRESS_LEVEL'], brotli_quality=app.config['COMPRESS_BROTLI_QUALITY'])
+
+def read_only(view):
+  # Marks a view as safe to serve from the read replica, if one is
+  # configured and this client has not written anything very recently.
+  @wraps(view)
+  def wrapper(*args, **kwargs):
+    if 'replica' in (app.config['SQLALCHEMY_BINDS'] or {}) and \
+        session.get('read_primary_until', 0) < time.time():
+      g.read_replica = True
+    return view(*args, **kwargs)
+  wrapper.read_only = True
+  return wrapper
+
+@db.event.listens_for(RoutingSession, 'after_flush')
+def stick_to_primary(db_session, flush_context):
+  if has_request_context() and 'replica' in (app.config['SQLALCHEMY_BINDS'] or {}):
+    session['read_primary_until'] = time.time() + app.config['REPLICA_STICKY_SECONDS']
 
 #----------------------------------------------------------------------------#
 # Models.
@@ -34,19 +100,184 @@ migrate = Migrate(app, db)
 
 from models import *
 
+#----------------------------------------------------------------------------#
+# Caches.
+#----------------------------------------------------------------------------#
+
+# Rendered detail pages, keyed by venue/artist id.
+venue_page_cache = LRUCache(app.config['PAGE_CACHE_SIZE'], app.config['PAGE_CACHE_TTL'])
+artist_page_cache = LRUCache(app.config['PAGE_CACHE_SIZE'], app.config['PAGE_CACHE_TTL'])
+
+# Recent (type, prefix) autocomplete lookups.
+autocomplete_cache = LRUCache(app.config['AUTOCOMPLETE_CACHE_SIZE'], app.config['AUTOCOMPLETE_CACHE_TTL'])
+
+metrics.register_cache('venue_page', venue_page_cache)
+metrics.register_cache('artist_page', artist_page_cache)
+metrics.register_cache('autocomplete', autocomplete_cache)
+
+def invalidate_venue_pages(venue_id):
+  # The venue's own page, plus the artist pages that list its shows.
+  venue_page_cache.invalidate(venue_id)
+  artist_page_cache.invalidate(*[artist_id for artist_id, in
+    db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()])
+
+def invalidate_artist_pages(artist_id):
+  # The artist's own page, plus the venue pages that list its shows.
+  artist_page_cache.invalidate(artist_id)
+  venue_page_cache.invalidate(*[venue_id for venue_id, in
+    db.session.query(Show.venue_id).filter(Show.artist_id == artist_id).distinct()])
+
+#----------------------------------------------------------------------------#
+# Show counts.
+#----------------------------------------------------------------------------#
+
+SHOW_COUNT_VIEWS = {Venue: venue_show_counts, Artist: artist_show_counts}
+
+# Engines whose show table is known to have the counter triggers. Only that
+# answer is kept: the triggers can be installed (`flask db upgrade`) while
+# the process runs, and the app must stop counting the moment they are.
+_show_count_triggers = set()
+_show_count_triggers_reported = set()
+
+def counters_maintained_by_database():
+  # True when the show table triggers (migration 7c3e9d1f4a52) keep the
+  # venue and artist counters current; otherwise the app updates them
+  # alongside its own writes. Only PostgreSQL has them, and only once
+  # migrated, so pg_trigger is checked rather than the dialect. Callers ask
+  # after writing to the show table: CREATE TRIGGER waits for their
+  # transaction from then on, so the answer holds until it commits.
+  engine = db.engine
+  if engine.dialect.name != 'postgresql':
+    return False
+  if engine in _show_count_triggers:
+    return True
+  found = set(db.session.execute(db.text(
+    "SELECT tgname FROM pg_trigger WHERE tgrelid = 'show'::regclass AND NOT tgisinternal"
+  )).scalars())
+  missing = SHOW_COUNTS_TRIGGER_NAMES - found
+  if missing:
+    if engine not in _show_count_triggers_reported:
+      _show_count_triggers_reported.add(engine)
+      app.logger.warning('Show count triggers missing (%s), run `flask db upgrade`; '
+        'the app maintains the show counters meanwhile.', ', '.join(sorted(missing)))
+    return False
+  _show_count_triggers.add(engine)
+  return True
+
+def show_counts_from_views():
+  return app.config['SHOW_COUNTS_SOURCE'] == 'matview' and db.engine.dialect.name == 'postgresql'
+
+def query_with_show_counts(model, *columns):
+  # Selects `columns` plus the model's upcoming_shows_count and
+  # past_shows_count, read from its counter columns or, when
+  # SHOW_COUNTS_SOURCE is 'matview', joined in from its materialized view.
+  if show_counts_from_views():
+    view = SHOW_COUNT_VIEWS[model]
+    return db.session.query(
+      *columns,
+      db.func.coalesce(view.c.upcoming_shows_count, 0).label('upcoming_shows_count'),
+      db.func.coalesce(view.c.past_shows_count, 0).label('past_shows_count')
+    ).select_from(model).outerjoin(view, view.c[f'{model.__tablename__}_id'] == model.id)
+  return db.session.query(*columns, model.upcoming_shows_count, model.past_shows_count)
+
+#----------------------------------------------------------------------------#
+# Genres.
+#----------------------------------------------------------------------------#
+
+@db.event.listens_for(RoutingSession, 'before_flush')
+def sync_genre_links(db_session, flush_context, instances):
+  # Mirrors every new or changed `genres` array into the genre link tables.
+  changed = [instance for instance in (*db_session.new, *db_session.dirty)
+    if isinstance(instance, (Venue, Artist))
+    and db.inspect(instance).attrs.genres.history.has_changes()]
+  if changed:
+    with db_session.no_autoflush:
+      genres = {genre.name: genre for genre in
+        genres_named({name for instance in changed for name in instance.genres or ()})}
+      for instance in changed:
+        instance.genre_links = [genres[name] for name in sorted(set(instance.genres or ()))]
+
+#----------------------------------------------------------------------------#
+# Freshness.
+#----------------------------------------------------------------------------#
+
+# List pages are validated by the newest updated_at of each table they read
+# and the time rows were last deleted from it (TableDeletion), one index
+# lookup each, in one statement: inserts and updates move the newest stamp,
+# and deletes, which all go through delete_with_shows, stamp the tables they
+# delete from. Bulk UPDATEs stamp rows through the columns' onupdate, and
+# the importer stamps what it writes. A write stamped before, but committed
+# after, a newer one goes unseen until the next write; every write here
+# commits right after its flush.
+
+VERSIONED_MODELS = {'venue': Venue, 'artist': Artist, 'show': Show}
+
+def table_versions(*names):
+  # (validators, last_modified) of list pages that read the given tables.
+  stamps = []
+  for name in sorted(names):
+    model = VERSIONED_MODELS[name]
+    stamps.append(db.select(db.func.max(model.updated_at)).scalar_subquery())
+    stamps.append(db.select(TableDeletion.deleted_at).where(TableDeletion.name == name).scalar_subquery())
+    if model in SHOW_COUNT_VIEWS and show_counts_from_views():
+      # Counts read from a materialized view change when it is refreshed.
+      stamps.append(db.select(SHOW_COUNT_VIEWS[model].c.refreshed_at).limit(1).scalar_subquery())
+  row = db.session.query(*stamps).one()
+  return tuple(row), max((stamp for stamp in row if stamp is not None), default=None)
+
+def _entity_versions(model, entity_id, show_fk, other, other_fk):
+  # (validators, last_modified) of a venue or artist page: its own stamp,
+  # the newest stamp among its shows and the entities on the other side of
+  # them, and how many of its shows are still upcoming right now, so that
+  # shows moving to past change it too. One grouped query, no rendering.
+  row = db.session.query(
+    model.updated_at,
+    db.func.max(Show.updated_at),
+    db.func.max(other.updated_at),
+    db.func.count(Show.id),
+    db.func.count(db.case((Show.start_time > datetime.now(), Show.id)))
+  ).select_from(model) \
+    .outerjoin(Show, show_fk == model.id) \
+    .outerjoin(other, other_fk == other.id) \
+    .filter(model.id == entity_id) \
+    .group_by(model.id, model.updated_at).first()
+  if row is None:
+    return None
+  return tuple(row), max(stamp for stamp in row[:3] if stamp is not None)
+
+def venue_versions(venue_id):
+  return _entity_versions(Venue, venue_id, Show.venue_id, Artist, Show.artist_id)
+
+def artist_versions(artist_id):
+  return _entity_versions(Artist, artist_id, Show.artist_id, Venue, Show.venue_id)
+
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma"
+}
+
+DATETIME_LOCALE = babel.Locale.parse('en')
+
+@lru_cache(maxsize=None)
+def _datetime_pattern(format):
+  # Babel patterns are compiled once per format instead of on every call.
+  return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format))
+
+@lru_cache(maxsize=4096)
 def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
+  # Takes datetime objects as they come from the database; strings are
+  # still parsed for templates that pass them. Listings repeat the same
+  # timestamps a lot, so formatted results are memoized.
+  if isinstance(value, str):
+    value = dateutil.parser.parse(value)
+  return _datetime_pattern(format).apply(value, DATETIME_LOCALE)
 
 app.jinja_env.filters['datetime'] = format_datetime
+app.jinja_env.globals['asset_urls'] = asset_urls
 
 #----------------------------------------------------------------------------#
 # Controllers.
@@ -56,19 +287,49 @@ app.jinja_env.filters['datetime'] = format_datetime
 def index():
   return render_template('pages/home.html')
 
+#  Search
+#  ----------------------------------------------------------------
+def _escape_like(term):
+  return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search_by_name(model, search_term):
+  # Case-insensitive partial match on name, best matches first, capped at
+  # SEARCH_RESULTS_LIMIT rows.
+  query = query_with_show_counts(model, model.id, model.name) \
+    .filter(model.name.ilike(f'%{_escape_like(search_term)}%', escape='\\'))
+
+  if db.engine.dialect.name == 'postgresql':
+    # The pg_trgm GIN index on name serves the ILIKE, similarity() ranks it.
+    query = query.order_by(db.func.similarity(model.name, search_term).desc(), model.name)
+  else:
+    # No trigram support: scan, then rank earlier and tighter matches first.
+    query = query.order_by(
+      db.func.instr(db.func.lower(model.name), search_term.lower()),
+      db.func.length(model.name),
+      model.name
+    )
+
+  return query.limit(app.config['SEARCH_RESULTS_LIMIT']).all()
+
 #  Venues
 #  ----------------------------------------------------------------
 @app.route('/venues')
+@read_only
+@conditional(lambda: table_versions('venue', 'show'))
+@query_budget(1)
 def venues():
   # [Done] TODO: replace with real venues data.
   # num_shows should be aggregated based on number of upcoming shows per venue.
 
-  all_venues_areas = db.session.query(Venue.state, Venue.city).group_by(Venue.state, Venue.city).all()
+  # One ordered query for every area; rows of the same (state, city) arrive
+  # next to each other, so they can be grouped in a single pass.
+  all_venues = query_with_show_counts(
+    Venue, Venue.id, Venue.name, Venue.city, Venue.state
+  ).order_by(Venue.state, Venue.city, Venue.id)
 
   data = []
 
-  for area in all_venues_areas:
-    venues = db.session.query(Venue).filter_by(state=area.state).filter_by(city=area.city).all()
+  for (state, city), venues in groupby(all_venues, key=lambda venue: (venue.state, venue.city)):
     venue_info = []
     for venue in venues:
       venue_info.append({
@@ -77,8 +338,8 @@ def venues():
         "num_upcoming_shows": venue.upcoming_shows_count
       })
     data.append({
-      "city": area.city,
-      "state": area.state,
+      "city": city,
+      "state": state,
       "venues": venue_info
     })
   return render_template('pages/venues.html', areas=data)
@@ -86,12 +347,14 @@ def venues():
 #  Search for a Venue
 #  ----------------------------------------------------------------
 @app.route('/venues/search', methods=['POST'])
+@read_only
+@query_budget(1)
 def search_venues():
   # [Done] TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
   # seach for Hop should return "The Musical Hop".
   # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
   search_term = request.form.get('search_term', '')
-  search_results = Venue.query.filter(Venue.name.ilike(f'%{search_term}%')).all()
+  search_results = search_by_name(Venue, search_term)
 
   response={
     "count": len(search_results),
@@ -110,27 +373,37 @@ def search_venues():
 #  View a Venue
 #  ----------------------------------------------------------------
 @app.route('/venues/<int:venue_id>')
+@read_only
+@conditional(venue_versions)
+@cached_page(venue_page_cache)
+@query_budget(2)
 def show_venue(venue_id):
   # shows the venue page with the given venue_id
   # [Done] TODO: replace with real venue data from the venues table, using venue_id
   
-  venue = Venue.query.get(venue_id)
-  
+  venue = Venue.query.get_or_404(venue_id)
+
+  # Only the columns the template renders, joined in one query; whether a
+  # show is upcoming is decided by the database from its start time.
+  shows = db.session.query(
+    Show.artist_id,
+    Artist.name.label('artist_name'),
+    Artist.image_link.label('artist_image_link'),
+    Show.start_time,
+    (Show.start_time > datetime.now()).label('is_upcoming')
+  ).join(Artist, Show.artist_id == Artist.id).filter(Show.venue_id == venue_id).order_by(Show.start_time)
+
   upcoming_shows = []
   past_shows = []
-  shows = venue.shows
 
   for show in shows:
     show_info = {
       "artist_id": show.artist_id,
-      "artist_name": show.artist.name,
-      "artist_image_link": show.artist.image_link,
-      "start_time": str(show.start_time)
+      "artist_name": show.artist_name,
+      "artist_image_link": show.artist_image_link,
+      "start_time": show.start_time
     }
-    if(show.upcoming): 
-      upcoming_shows.append(show_info)
-    else:
-      past_shows.append(show_info)
+    (upcoming_shows if show.is_upcoming else past_shows).append(show_info)
 
   data = {
     "id": venue.id,
@@ -182,6 +455,7 @@ def create_venue_submission():
     try:
       db.session.add(venue)
       db.session.commit()
+      autocomplete_cache.clear()
       # on successful db insert, flash success
       flash('Venue ' + request.form['name'] + ' was successfully listed!')
     except:
@@ -201,39 +475,95 @@ def create_venue_submission():
 #  ----------------------------------------------------------------
 # [Done] TODO: Complete this endpoint for taking a venue_id, and using
 # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_with_shows(model, entity_id, show_fk, other, other_fk):
+  # Deletes a venue or artist and its shows set-based, in one transaction:
+  # one DELETE of the shows returning each one's counterpart and flag, one
+  # executemany decrementing the counterparts' counters by what it returned
+  # (done by the show triggers where installed), then the genre links and
+  # the entity itself, and one upsert stamping the tables deleted from.
+  # Counting the deleted rows themselves, rather than reading them first,
+  # leaves no gap for a show booked meanwhile to be deleted uncounted.
+  # Returns the ids of the counterparts that lost shows, or None if there is
+  # no such entity.
+  #
+  # Written as text: SQLAlchemy 1.4 compiles RETURNING for PostgreSQL only,
+  # while SQLite runs it from 3.35 on.
+  deleted_shows = db.session.execute(db.text(
+    f'DELETE FROM show WHERE {show_fk.name} = :entity_id RETURNING {other_fk.name}, upcoming'
+  ), {'entity_id': entity_id}).all()
+  affected = {}
+  for other_id, upcoming in deleted_shows:
+    counts = affected.setdefault(other_id, {'upcoming': 0, 'past': 0})
+    counts['upcoming' if upcoming else 'past'] += 1
+
+  if affected and not counters_maintained_by_database():
+    db.session.execute(
+      db.update(other.__table__).where(other.__table__.c.id == db.bindparam('other_id')).values(
+        upcoming_shows_count=db.func.coalesce(other.__table__.c.upcoming_shows_count, 0) - db.bindparam('upcoming'),
+        past_shows_count=db.func.coalesce(other.__table__.c.past_shows_count, 0) - db.bindparam('past')),
+      [dict(counts, other_id=other_id) for other_id, counts in affected.items()]
+    )
+  links = GENRE_LINKS[model.__tablename__]
+  db.session.execute(db.delete(links).where(links.c[f'{model.__tablename__}_id'] == entity_id))
+  deleted = db.session.execute(
+    db.delete(model).where(model.id == entity_id).execution_options(synchronize_session=False)
+  ).rowcount
+  if not deleted:
+    db.session.rollback()
+    return None
+  stamp_deletions(model.__tablename__, *(['show'] if affected else []))
+
+  db.session.commit()
+  autocomplete_cache.clear()
+  return list(affected)
+
+@app.route('/venues/<int:venue_id>', methods=['DELETE'])
+@query_budget(6)
 def delete_venue(venue_id):
+  # Answers 204 No Content, or a JSON error.
   try:
-    venue = Venue.query.get(venue_id)
-    db.session.delete(venue)
-    db.session.commit()
-    flash('Venue ' + venue.name + ' was successfully deleted!')
-  except:
+    artist_ids = delete_with_shows(Venue, venue_id, Show.venue_id, Artist, Show.artist_id)
+  except Exception:
     db.session.rollback()
-    flash('An error occurred. Venue ' + venue.name + ' could not be deleted.')
+    app.logger.exception('Deleting venue %s failed', venue_id)
+    return jsonify(error=f'Venue {venue_id} could not be deleted.'), 500
   finally:
     db.session.close()
+  if artist_ids is None:
+    return jsonify(error=f'There is no venue #{venue_id}.'), 404
+  venue_page_cache.invalidate(venue_id)
+  artist_page_cache.invalidate(*artist_ids)
   # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
   # clicking that button delete it from the db then redirect the user to the homepage
-  return render_template('pages/home.html')
-
-
+  return '', 204
 
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@read_only
+@conditional(lambda: table_versions('artist'))
+@query_budget(1)
 def artists():
   # [Done] TODO: replace with real data returned from querying the database
-  data = Artist.query.all()
-  return render_template('pages/artists.html', artists=data)
+  artists, next_cursor, prev_cursor = keyset_page(
+    db.session.query(Artist.id, Artist.name),
+    (Artist.name, Artist.id),
+    app.config['ARTISTS_PER_PAGE'],
+    after=request.args.get('after'),
+    before=request.args.get('before')
+  )
+  return render_template('pages/artists.html', artists=artists,
+    next_cursor=next_cursor, prev_cursor=prev_cursor)
 
 @app.route('/artists/search', methods=['POST'])
+@read_only
+@query_budget(1)
 def search_artists():
   # [Done] TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
   # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
   # search for "band" should return "The Wild Sax Band".
   search_term = request.form.get('search_term', '')
-  search_results = Artist.query.filter(Artist.name.ilike(f'%{search_term}%')).all()
+  search_results = search_by_name(Artist, search_term)
 
   response={
     "count": len(search_results),
@@ -250,26 +580,35 @@ def search_artists():
   return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
 
 @app.route('/artists/<int:artist_id>')
+@read_only
+@conditional(artist_versions)
+@cached_page(artist_page_cache)
+@query_budget(2)
 def show_artist(artist_id):
   # shows the artist page with the given artist_id
   # [Done] TODO: replace with real artist data from the artist table, using artist_id
-  artist = Artist.query.get(artist_id)
-  shows = artist.shows
+  artist = Artist.query.get_or_404(artist_id)
+
+  shows = db.session.query(
+    Show.venue_id,
+    Venue.name.label('venue_name'),
+    Venue.image_link.label('venue_image_link'),
+    Show.start_time,
+    (Show.start_time > datetime.now()).label('is_upcoming')
+  ).join(Venue, Show.venue_id == Venue.id).filter(Show.artist_id == artist_id).order_by(Show.start_time)
+
   past_shows = []
   upcoming_shows = []
-  
+
   for show in shows:
     show_info = {
       "venue_id": show.venue_id,
-      "venue_name": show.venue.name,
-      "venue_image_link": show.venue.image_link,
-      "start_time": str(show.start_time)
+      "venue_name": show.venue_name,
+      "venue_image_link": show.venue_image_link,
+      "start_time": show.start_time
     }
-    if(show.upcoming):
-      upcoming_shows.append(show_info)
-    else:
-      past_shows.append(show_info)
-  
+    (upcoming_shows if show.is_upcoming else past_shows).append(show_info)
+
   data = {
     "id": artist.id,
     "name": artist.name,
@@ -292,6 +631,7 @@ def show_artist(artist_id):
 #  Update
 #  ----------------------------------------------------------------
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@query_budget(1)
 def edit_artist(artist_id):
   form = ArtistForm()
   artist = Artist.query.get(artist_id)
@@ -330,6 +670,8 @@ def edit_artist_submission(artist_id):
       artist.seeking_description = request.form['seeking_description']
 
       db.session.commit()
+      autocomplete_cache.clear()
+      invalidate_artist_pages(artist_id)
       flash('Artist ' + artist.name + ' was successfully updated!')
     except: 
       db.session.rollback()
@@ -347,6 +689,7 @@ def edit_artist_submission(artist_id):
   return redirect(url_for('show_artist', artist_id=artist_id))
 
 @app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@query_budget(1)
 def edit_venue(venue_id):
   form = VenueForm()
   venue = Venue.query.get(venue_id)
@@ -385,6 +728,8 @@ def edit_venue_submission(venue_id):
       venue.seeking_description = request.form['seeking_description']
 
       db.session.commit()
+      autocomplete_cache.clear()
+      invalidate_venue_pages(venue_id)
       flash('Venue ' + venue.name + ' was successfully updated!')
     except: 
       db.session.rollback()
@@ -431,6 +776,7 @@ def create_artist_submission():
     try:
       db.session.add(artist)
       db.session.commit()
+      autocomplete_cache.clear()
       # on successful db insert, flash success
       flash('Artist ' + artist.name + ' was successfully listed!')
     except Exception as e:
@@ -446,29 +792,101 @@ def create_artist_submission():
   return render_template('pages/home.html')
 
 
+#  Delete an Artist
+#  ----------------------------------------------------------------
+
+@app.route('/artists/<int:artist_id>', methods=['DELETE'])
+@query_budget(6)
+def delete_artist(artist_id):
+  # Answers 204 No Content, or a JSON error.
+  try:
+    venue_ids = delete_with_shows(Artist, artist_id, Show.artist_id, Venue, Show.venue_id)
+  except Exception:
+    db.session.rollback()
+    app.logger.exception('Deleting artist %s failed', artist_id)
+    return jsonify(error=f'Artist {artist_id} could not be deleted.'), 500
+  finally:
+    db.session.close()
+  if venue_ids is None:
+    return jsonify(error=f'There is no artist #{artist_id}.'), 404
+  artist_page_cache.invalidate(artist_id)
+  venue_page_cache.invalidate(*venue_ids)
+  return '', 204
+
+#  Genres
+#  ----------------------------------------------------------------
+
+def _entities_in_genre(model, links, genre_id):
+  # Up to GENRE_RESULTS_LIMIT rows, walked from the (genre_id, entity_id)
+  # link index into the entity's primary key.
+  limit = app.config['GENRE_RESULTS_LIMIT']
+  rows = query_with_show_counts(model, model.id, model.name, model.city, model.state) \
+    .join(links, links.c[f'{model.__tablename__}_id'] == model.id) \
+    .filter(links.c.genre_id == genre_id) \
+    .order_by(model.name, model.id) \
+    .limit(limit + 1).all()
+  return [{
+    "id": row.id,
+    "name": row.name,
+    "city": row.city,
+    "state": row.state,
+    "num_upcoming_shows": row.upcoming_shows_count
+  } for row in rows[:limit]], len(rows) > limit
+
+@app.route('/genres/<name>')
+@read_only
+@conditional(lambda name: table_versions('venue', 'artist', 'show'))
+@query_budget(3)
+def show_genre(name):
+  genre = Genre.query.filter_by(name=name).first_or_404()
+  venues, more_venues = _entities_in_genre(Venue, venue_genre, genre.id)
+  artists, more_artists = _entities_in_genre(Artist, artist_genre, genre.id)
+  return render_template('pages/show_genre.html', genre=genre.name,
+    venues=venues, more_venues=more_venues, artists=artists, more_artists=more_artists)
+
 #  Shows
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@read_only
+@conditional(lambda: table_versions('venue', 'artist', 'show'))
+@query_budget(1)
 def shows():
   # displays list of shows at /shows
   # [Done] TODO: replace with real venues data.
   # num_shows should be aggregated based on number of upcoming shows per venue.
-  shows = Show.query.all()
+  upcoming = db.session.query(
+    Show.id,
+    Show.venue_id,
+    Venue.name.label('venue_name'),
+    Show.artist_id,
+    Artist.name.label('artist_name'),
+    Artist.image_link.label('artist_image_link'),
+    Show.start_time
+  ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id) \
+    .filter(Show.upcoming, Show.start_time > datetime.now())
+
+  shows, next_cursor, prev_cursor = keyset_page(
+    upcoming,
+    (Show.start_time, Show.id),
+    app.config['SHOWS_PER_PAGE'],
+    after=request.args.get('after'),
+    before=request.args.get('before')
+  )
   data = []
 
   for show in shows:
-    if(show.upcoming):
-      data.append({
+    data.append({
       "venue_id": show.venue_id,
-      "venue_name": show.venue.name,
+      "venue_name": show.venue_name,
       "artist_id": show.artist_id,
-      "artist_name": show.artist.name,
-      "artist_image_link": show.artist.image_link,
-      "start_time": str(show.start_time)
-      })
-  
-  return render_template('pages/shows.html', shows=data)
+      "artist_name": show.artist_name,
+      "artist_image_link": show.artist_image_link,
+      "start_time": show.start_time
+    })
+
+  return render_template('pages/shows.html', shows=data,
+    next_cursor=next_cursor, prev_cursor=prev_cursor)
 
 @app.route('/shows/create')
 def create_shows():
@@ -476,37 +894,57 @@ def create_shows():
   form = ShowForm()
   return render_template('forms/new_show.html', form=form)
 
+def missing_show_parties(artist_id, venue_id):
+  # Checks both ids with a single SELECT EXISTS(...), EXISTS(...) before
+  # anything is written, so a stale or hand-edited id is reported instead of
+  # failing the insert on its foreign key. Returns the error messages.
+  artist_exists, venue_exists = db.session.query(
+    db.session.query(Artist.id).filter(Artist.id == artist_id).exists(),
+    db.session.query(Venue.id).filter(Venue.id == venue_id).exists()
+  ).one()
+  return ([] if artist_exists else [f'There is no artist #{artist_id}.']) + \
+    ([] if venue_exists else [f'There is no venue #{venue_id}.'])
+
+def book_show(artist_id, venue_id, start_time):
+  # Inserts the show and bumps its venue and artist counters in one
+  # transaction (where the show triggers are in place, they do the bumping).
+  # The increments run in the database (count = count + 1), so concurrent
+  # bookings at the same venue never lose an update, and nothing is
+  # reloaded through the ORM.
+  show = Show(artist_id=artist_id, venue_id=venue_id, start_time=start_time,
+    upcoming=start_time > datetime.now())
+  db.session.add(show)
+  db.session.flush()
+
+  if not counters_maintained_by_database():
+    counter = 'upcoming_shows_count' if show.upcoming else 'past_shows_count'
+    for model, entity_id in ((Venue, venue_id), (Artist, artist_id)):
+      column = getattr(model, counter)
+      db.session.execute(
+        db.update(model).where(model.id == entity_id)
+          .values({column: db.func.coalesce(column, 0) + 1})
+          .execution_options(synchronize_session=False)
+      )
+
+  db.session.commit()
+
 @app.route('/shows/create', methods=['POST'])
 def create_show_submission():
   # called to create new shows in the db, upon submitting new show listing form
   # [Done] TODO: insert form data as a new Show record in the db, instead
   form = ShowForm()
   if form.validate_on_submit():
+    artist_id, venue_id = form.artist_id.data, form.venue_id.data
+    missing = missing_show_parties(artist_id, venue_id)
+    if missing:
+      for message in missing:
+        flash(f'Error: {message} Show could not be listed.')
+      return render_template('pages/home.html')
     try: 
-      show = Show()
-      show.artist_id = request.form['artist_id']
-      show.venue_id = request.form['venue_id']
-      show.start_time = request.form['start_time']
-
-      db.session.add(show)
-      db.session.commit()
-      
-      now = datetime.now()
-      show.upcoming = (now < show.start_time)
-      artist = Artist.query.get(show.artist_id)
-      venue = Venue.query.get(show.venue_id)
-
-      if(show.upcoming):
-        artist.upcoming_shows_count += 1
-        venue.upcoming_shows_count += 1
-      else:
-        artist.past_shows_count += 1
-        venue.past_shows_count += 1  
-      
-      db.session.add(artist)    
-      db.session.add(venue)
-      db.session.commit()
+      book_show(artist_id, venue_id, form.start_time.data)
 
+      venue_page_cache.invalidate(venue_id)
+      artist_page_cache.invalidate(artist_id)
 
       # on successful db insert, flash success
       flash('Show was successfully listed!')
@@ -526,6 +964,168 @@ def create_show_submission():
   
   return render_template('pages/home.html')
 
+#  Autocomplete
+#  ----------------------------------------------------------------
+AUTOCOMPLETE_MODELS = {'venue': Venue, 'artist': Artist}
+
+@app.route('/api/autocomplete')
+@read_only
+@query_budget(1)
+def autocomplete():
+  # Top name-prefix matches for the type-ahead search boxes, as a compact
+  # JSON list of {"id", "name"} objects.
+  entity_type = request.args.get('type', '')
+  model = AUTOCOMPLETE_MODELS.get(entity_type)
+  if model is None:
+    return jsonify(error="type must be 'venue' or 'artist'"), 400
+
+  prefix = request.args.get('q', '').strip().lower()
+  if not prefix:
+    return Response('[]', mimetype='application/json')
+
+  key = (entity_type, prefix)
+  matches = autocomplete_cache.get(key)
+  if matches is None:
+    rows = db.session.query(model.id, model.name) \
+      .filter(db.func.lower(model.name).like(f'{_escape_like(prefix)}%', escape='\\')) \
+      .order_by(db.func.lower(model.name), model.id) \
+      .limit(app.config['AUTOCOMPLETE_LIMIT'])
+    # Encoded here rather than by jsonify, which indents in debug mode (and
+    # config.py turns debug on), and cached encoded.
+    matches = json.dumps([{"id": row.id, "name": row.name} for row in rows],
+      separators=(',', ':'), ensure_ascii=False)
+    autocomplete_cache.set(key, matches)
+
+  return Response(matches, mimetype='application/json')
+
+#  Streaming JSON API
+#  ----------------------------------------------------------------
+# Exports stream straight from a server-side cursor: rows are fetched
+# API_STREAM_BATCH at a time and written out as they arrive, so memory stays
+# constant and the first byte goes out before the query has finished.
+
+class ApiArgumentError(ValueError):
+  pass
+
+def _json_default(value):
+  if isinstance(value, datetime):
+    return value.isoformat()
+  raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def _datetime_arg(name):
+  value = request.args.get(name)
+  if not value:
+    return None
+  try:
+    return datetime.fromisoformat(value)
+  except ValueError:
+    raise ApiArgumentError(f'{name} must be an ISO 8601 date or datetime')
+
+def _filter_by_area_and_genre(query, model):
+  # ?city=, ?state= and ?genre= apply to `model`, all pushed down into SQL.
+  if request.args.get('city'):
+    query = query.filter(model.city == request.args['city'])
+  if request.args.get('state'):
+    query = query.filter(model.state == request.args['state'])
+  if request.args.get('genre'):
+    query = query.filter(model.genre_links.any(Genre.name == request.args['genre']))
+  return query
+
+def stream_rows(query):
+  # ?format=ndjson (default) writes one object per line, ?format=json
+  # writes a single JSON array in chunks.
+  output_format = request.args.get('format', 'ndjson')
+  if output_format not in ('ndjson', 'json'):
+    return jsonify(error="format must be 'ndjson' or 'json'"), 400
+
+  rows = query.execution_options(stream_results=True).yield_per(app.config['API_STREAM_BATCH'])
+
+  def generate_ndjson():
+    for row in rows:
+      yield json.dumps(row._asdict(), default=_json_default) + '\n'
+
+  def generate_json():
+    yield '['
+    separator = ''
+    for row in rows:
+      yield separator + json.dumps(row._asdict(), default=_json_default)
+      separator = ','
+    yield ']\n'
+
+  if output_format == 'json':
+    return Response(stream_with_context(generate_json()), mimetype='application/json')
+  return Response(stream_with_context(generate_ndjson()), mimetype='application/x-ndjson')
+
+@app.errorhandler(ApiArgumentError)
+def api_argument_error(error):
+  return jsonify(error=str(error)), 400
+
+@app.route('/api/shows')
+@read_only
+def api_shows():
+  # ?from= and ?to= bound start_time; city/state filter on the venue and
+  # genre on the artist.
+  query = db.session.query(
+    Show.id,
+    Show.start_time,
+    Show.venue_id,
+    Venue.name.label('venue_name'),
+    Venue.city,
+    Venue.state,
+    Show.artist_id,
+    Artist.name.label('artist_name')
+  ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id)
+
+  start = _datetime_arg('from')
+  end = _datetime_arg('to')
+  if start:
+    query = query.filter(Show.start_time >= start)
+  if end:
+    query = query.filter(Show.start_time < end)
+  if request.args.get('city'):
+    query = query.filter(Venue.city == request.args['city'])
+  if request.args.get('state'):
+    query = query.filter(Venue.state == request.args['state'])
+  if request.args.get('genre'):
+    query = query.filter(Artist.genre_links.any(Genre.name == request.args['genre']))
+
+  return stream_rows(query.order_by(Show.start_time, Show.id))
+
+@app.route('/api/venues')
+@read_only
+def api_venues():
+  query = query_with_show_counts(
+    Venue, Venue.id, Venue.name, Venue.genres, Venue.address, Venue.city, Venue.state,
+    Venue.phone, Venue.website_link, Venue.facebook_link, Venue.image_link,
+    Venue.seeking_talent, Venue.seeking_description
+  )
+  return stream_rows(_filter_by_area_and_genre(query, Venue).order_by(Venue.id))
+
+@app.route('/api/artists')
+@read_only
+def api_artists():
+  query = query_with_show_counts(
+    Artist, Artist.id, Artist.name, Artist.genres, Artist.city, Artist.state,
+    Artist.phone, Artist.website_link, Artist.facebook_link, Artist.image_link,
+    Artist.seeking_venue, Artist.seeking_description
+  )
+  return stream_rows(_filter_by_area_and_genre(query, Artist).order_by(Artist.id))
+
+#  Metrics
+#  ----------------------------------------------------------------
+
+@app.route('/metrics')
+def metrics_endpoint():
+  return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+#  Built assets
+#  ----------------------------------------------------------------
+# Takes precedence over the plain static route for static/dist/.
+
+@app.route('/static/dist/<path:filename>')
+def built_asset(filename):
+  return send_built_asset(filename)
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -534,6 +1134,153 @@ def not_found_error(error):
 def server_error(error):
     return render_template('errors/500.html'), 500
 
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+def _move_show_counts_to_past(model, show_fk, show_ids):
+  # Moves the given shows from the upcoming to the past counter of their
+  # venue or artist, with one aggregate UPDATE for the whole batch.
+  counts = db.session.query(
+    show_fk.label('owner_id'), db.func.count().label('n')
+  ).filter(Show.id.in_(show_ids)).group_by(show_fk).subquery()
+
+  if db.engine.dialect.name == 'postgresql':
+    moved = counts.c.n
+    owners = model.id == counts.c.owner_id
+  else:
+    # No UPDATE ... FROM on this backend, correlate the aggregate instead.
+    moved = db.select(counts.c.n).where(counts.c.owner_id == model.id).scalar_subquery()
+    owners = model.id.in_(db.select(counts.c.owner_id))
+
+  db.session.execute(
+    db.update(model).where(owners).values(
+      upcoming_shows_count=db.func.coalesce(model.upcoming_shows_count, 0) - moved,
+      past_shows_count=db.func.coalesce(model.past_shows_count, 0) + moved
+    ).execution_options(synchronize_session=False)
+  )
+
+def sweep_shows(batch_size=5000):
+  # Flips every show whose start time has passed to past, batch by batch.
+  # Each batch locks its rows with SKIP LOCKED so that overlapping runs
+  # never move the same show twice, and commits before taking the next one.
+  now = datetime.now()
+  swept = 0
+
+  while True:
+    show_ids = [show_id for show_id, in db.session.query(Show.id)
+      .filter(Show.upcoming, Show.start_time <= now)
+      .order_by(Show.id)
+      .limit(batch_size)
+      .with_for_update(skip_locked=True)]
+    if not show_ids:
+      break
+
+    try:
+      db.session.query(Show).filter(Show.id.in_(show_ids)) \
+        .update({Show.upcoming: False}, synchronize_session=False)
+      # With the show triggers in place, flipping the flag moved the counts.
+      if not counters_maintained_by_database():
+        _move_show_counts_to_past(Venue, Show.venue_id, show_ids)
+        _move_show_counts_to_past(Artist, Show.artist_id, show_ids)
+      db.session.commit()
+    except:
+      db.session.rollback()
+      raise
+    swept += len(show_ids)
+
+  return swept
+
+def refresh_show_counts():
+  # Recomputes every venue and artist counter from the show table, with one
+  # correlated UPDATE per table.
+  for model, show_fk in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+    shows = db.select(db.func.count(Show.id)).where(show_fk == model.id)
+    db.session.execute(
+      db.update(model).values(
+        upcoming_shows_count=shows.where(Show.upcoming.is_(True)).scalar_subquery(),
+        past_shows_count=shows.where(Show.upcoming.is_(False)).scalar_subquery()
+      ).execution_options(synchronize_session=False)
+    )
+  db.session.commit()
+
+def refresh_show_count_views():
+  # Rebuilds the materialized show count views without blocking readers.
+  # REFRESH ... CONCURRENTLY cannot run inside a transaction block.
+  with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+    for view in SHOW_COUNT_VIEWS.values():
+      connection.execute(db.text(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {view.name}'))
+
+@app.cli.command('sweep-shows')
+@click.option('--batch-size', default=5000, show_default=True,
+  help='Number of shows flipped per transaction.')
+def sweep_shows_command(batch_size):
+  """Move shows whose start time has passed from upcoming to past."""
+  swept = sweep_shows(batch_size)
+  click.echo(f'{swept} shows moved to past.')
+
+@app.cli.command('refresh-show-counts')
+def refresh_show_counts_command():
+  """Recompute show counts: refresh the materialized views on PostgreSQL,
+  and the venue and artist counter columns wherever no triggers keep them."""
+  if db.engine.dialect.name == 'postgresql':
+    refresh_show_count_views()
+    click.echo('Show count views refreshed.')
+  if not counters_maintained_by_database():
+    refresh_show_counts()
+    click.echo('Show counters recomputed.')
+
+@app.cli.command('build-assets')
+def build_assets_command():
+  """Bundle, minify, fingerprint and precompress the static assets."""
+  assets = build_assets(app.static_folder)
+  for name, built in sorted(assets.items()):
+    click.echo(f'{name} -> {built}')
+  if brotli is None:
+    click.echo('Brotli is not installed: only .gz variants were written.', err=True)
+
+@app.cli.command('index-report')
+def index_report_command():
+  """EXPLAIN the queries of every read-only route and flag full table scans."""
+  from explain import index_report
+
+  try:
+    report = index_report()
+  except RuntimeError as error:
+    raise click.UsageError(str(error))
+
+  flagged_routes = 0
+  for method, rule, statements, flagged in report:
+    click.echo(f'{method} {rule}: {statements} queries' + ('' if flagged else ', no full scans'))
+    for statement, scans in flagged:
+      for table, detail in scans:
+        click.echo(f'  full scan of {table} ({detail})')
+      click.echo(f'    in: {statement[:160]}{"..." if len(statement) > 160 else ""}')
+    flagged_routes += bool(flagged)
+  click.echo(f'\n{flagged_routes} routes scan whole tables.')
+
+@app.cli.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=5000, show_default=True,
+  help='Number of rows written per transaction.')
+def import_command(kind, path, batch_size):
+  """Bulk-load venues, artists or shows from a CSV or NDJSON file."""
+  from importer import import_rows, read_rows
+
+  def report_error(number, errors):
+    click.echo(f'{path}:{number}: skipped, ' + '; '.join(
+      f'{field}: {", ".join(messages)}' for field, messages in errors.items()), err=True)
+
+  started = time.perf_counter()
+  imported, skipped = import_rows(kind, read_rows(path), batch_size, on_error=report_error)
+  if kind == 'shows' and not counters_maintained_by_database():
+    refresh_show_counts()
+  elapsed = time.perf_counter() - started
+
+  click.echo(f'Imported {imported} {kind} in {elapsed:.2f}s '
+    f'({imported / elapsed:.0f} rows/s), {skipped} rows skipped.')
+
 
 if not app.debug:
     file_handler = FileHandler('error.log')
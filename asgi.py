@@ -0,0 +1,120 @@
+import io
+import sys
+
+from sqlalchemy.util import await_only, greenlet_spawn
+
+from app import app
+
+#----------------------------------------------------------------------------#
+# ASGI server.
+#----------------------------------------------------------------------------#
+
+# Serves the app from an asyncio event loop, e.g.
+#
+#     uvicorn asgi:application --workers 4
+#
+# Each request runs the ordinary Flask app in its own greenlet, the way
+# SQLAlchemy's AsyncSession runs the sync ORM: with SQLALCHEMY_ASYNCIO on,
+# the engines use asyncpg (or aiosqlite), and every database round trip
+# suspends the request's greenlet and returns control to the event loop
+# until the result arrives. A worker process therefore keeps serving other
+# requests while one waits on a slow query, with no thread per request.
+# Views, page caches, conditional GET, query budgets, metrics and replica
+# routing all behave as under WSGI.
+#
+# Rendering and everything else that is not database I/O still runs on the
+# event loop thread, so run about one worker per core. Each worker holds at
+# most FYYUR_DB_POOL_SIZE + FYYUR_DB_MAX_OVERFLOW connections; requests
+# beyond that wait for a free one without blocking the loop.
+
+app.config['SQLALCHEMY_ASYNCIO'] = True
+
+
+def wsgi_environ(scope, body):
+    # The PEP 3333 environ for an ASGI HTTP scope, its body already read.
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    path = scope['path'][len(scope.get('root_path', '')):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f'HTTP/{scope["http_version"]}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        value = value.decode('latin-1')
+        environ[name] = f'{environ[name]},{value}' if name in environ else value
+    return environ
+
+
+def _serve(environ, send):
+    # Runs in the request's greenlet: the app's database calls, and the
+    # await_only() calls here, suspend it until their result is ready.
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                              for name, value in headers]
+
+    def send_start():
+        await_only(send({'type': 'http.response.start', 'status': started['status'],
+                         'headers': started['headers']}))
+
+    body = app(environ, start_response)
+    try:
+        # Streamed responses go out chunk by chunk, their queries included.
+        sent_start = False
+        for chunk in body:
+            if chunk:
+                if not sent_start:
+                    send_start()
+                    sent_start = True
+                await_only(send({'type': 'http.response.body', 'body': chunk, 'more_body': True}))
+        if not sent_start:
+            send_start()
+        await_only(send({'type': 'http.response.body', 'body': b''}))
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        raise ValueError(f'Unsupported ASGI scope type: {scope["type"]}')
+
+    body = b''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    await greenlet_spawn(_serve, wsgi_environ(scope, body), send)
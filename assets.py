@@ -0,0 +1,154 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+import rcssmin
+import rjsmin
+from flask import current_app, request, send_from_directory, url_for
+from werkzeug.utils import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#----------------------------------------------------------------------------#
+# Static assets.
+#----------------------------------------------------------------------------#
+
+# `flask build-assets` concatenates and minifies each bundle, and copies each
+# standalone file, into static/dist/ under a name carrying a hash of its
+# content, next to .gz and .br copies compressed ahead of time. The manifest
+# written alongside maps every logical name to its built file. Templates link
+# assets through asset_urls(), which falls back to the source files when
+# nothing has been built, as in development.
+#
+# A built file's content never changes under its name, so it is served as
+# immutable for a year, in the best encoding the client accepts.
+
+BUNDLES = {
+    'main.css': ['css/bootstrap.min.css', 'css/layout.main.css', 'css/main.css',
+                 'css/main.responsive.css', 'css/main.quickfix.css'],
+    # Needed before the page renders.
+    'head.js': ['js/libs/modernizr-2.8.2.min.js', 'js/libs/moment.min.js'],
+    # Deferred, in the order the pages used to load them.
+    'main.js': ['js/script.js', 'js/libs/bootstrap-3.1.1.min.js', 'js/plugins.js'],
+}
+
+# Linked on their own: respond.js for old IE only, jQuery as the CDN fallback.
+STANDALONE = ['js/libs/respond-1.4.2.min.js', 'js/libs/jquery-1.11.1.min.js']
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+MAX_AGE = 365 * 24 * 60 * 60
+
+# Precompressed variants, in order of preference.
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)(?!data:|[a-z]+://|/|#)([^'")]+)\1\s*\)''')
+
+_manifest = {'mtime': None, 'assets': {}}
+
+
+def _rebase_css_urls(css, source):
+    # Keeps relative url()s pointing at the same files from dist/.
+    source_dir = posixpath.dirname(source)
+
+    def rebase(match):
+        target = posixpath.normpath(posixpath.join(source_dir, match.group(2)))
+        return f'url({match.group(1)}{posixpath.relpath(target, DIST)}{match.group(1)})'
+    return _CSS_URL.sub(rebase, css)
+
+
+def _minify(name, sources, static_folder):
+    parts = []
+    for source in sources:
+        with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+            text = f.read()
+        if name.endswith('.css'):
+            parts.append(rcssmin.cssmin(_rebase_css_urls(text, source), keep_bang_comments=True))
+        else:
+            # A separator, so a file without a trailing semicolon cannot run
+            # into the next.
+            parts.append(rjsmin.jsmin(text, keep_bang_comments=True).rstrip().rstrip(';') + ';')
+    return '\n'.join(parts).encode('utf-8')
+
+
+def _write(dist, name, content):
+    # Writes content under its hashed name, with compressed copies, and
+    # returns that name.
+    stem, ext = os.path.splitext(os.path.basename(name))
+    built = f'{stem}.{hashlib.md5(content).hexdigest()[:12]}{ext}'
+    variants = {'': content, '.gz': gzip.compress(content, 9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+    for suffix, data in variants.items():
+        with open(os.path.join(dist, built + suffix), 'wb') as f:
+            f.write(data)
+    return built
+
+
+def build_assets(static_folder):
+    # Rebuilds static/dist/ from scratch; returns the manifest.
+    dist = os.path.join(static_folder, DIST)
+    shutil.rmtree(dist, ignore_errors=True)
+    os.makedirs(dist)
+
+    assets = {}
+    for name, sources in BUNDLES.items():
+        assets[name] = posixpath.join(DIST, _write(dist, name, _minify(name, sources, static_folder)))
+    for source in STANDALONE:
+        with open(os.path.join(static_folder, source), 'rb') as f:
+            assets[source] = posixpath.join(DIST, _write(dist, source, f.read()))
+
+    with open(os.path.join(dist, MANIFEST), 'w') as f:
+        json.dump(assets, f, indent=2, sort_keys=True)
+    return assets
+
+
+def _built_assets():
+    # The manifest, reread whenever a build replaces it.
+    path = os.path.join(current_app.static_folder, DIST, MANIFEST)
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return {}
+    if mtime != _manifest['mtime']:
+        with open(path) as f:
+            _manifest['assets'] = json.load(f)
+        _manifest['mtime'] = mtime
+    return _manifest['assets']
+
+
+def asset_urls(name):
+    # URLs to link for a bundle or standalone file: the built file if there
+    # is one, otherwise its sources.
+    built = _built_assets().get(name)
+    if built:
+        return [url_for('static', filename=built)]
+    return [url_for('static', filename=source) for source in BUNDLES.get(name, [name])]
+
+
+def send_built_asset(filename):
+    dist = os.path.join(current_app.static_folder, DIST)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    path, encoding = filename, None
+    for candidate, suffix in ENCODINGS:
+        variant = safe_join(dist, filename + suffix)
+        if request.accept_encodings[candidate] and variant and os.path.isfile(variant):
+            path, encoding = filename + suffix, candidate
+            break
+
+    response = send_from_directory(dist, path, mimetype=mimetype, max_age=MAX_AGE,
+                                   download_name=posixpath.basename(filename))
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
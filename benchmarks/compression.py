@@ -0,0 +1,89 @@
+"""Measures what response compression saves on the wire and costs in CPU.
+
+Requests every GET route through the test client once per encoding
+(identity, gzip and, with the Brotli package installed, br), --requests
+times each after a warm-up, and reports the bytes sent per response and the
+CPU time per request. The overhead column is the CPU time compression adds
+per request over the identity response.
+
+The dataset is generated into the database configured for the app unless
+--no-generate is given; point it at a scratch database.
+
+    python -m benchmarks.compression [--shows 10000] [--seed 0] [--requests 20]
+"""
+
+import argparse
+import time
+
+from app import app, db
+from benchmarks.dataset import generate
+from benchmarks.run import Fixture, routes
+from compress import brotli
+
+ENCODINGS = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+
+
+def measure(client, url, encoding, requests, warmup):
+    for i in range(warmup):
+        client.get(url(i), headers={'Accept-Encoding': encoding}).close()
+    sent = 0
+    started = time.process_time()
+    for i in range(requests):
+        response = client.get(url(i), headers={'Accept-Encoding': encoding})
+        sent += len(response.get_data())
+        response.close()
+    cpu = (time.process_time() - started) / requests
+    return {'bytes': sent / requests, 'cpu_ms': cpu * 1000,
+            'encoding': response.headers.get('Content-Encoding', 'identity')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shows', type=int, default=10000, help='shows in the generated dataset')
+    parser.add_argument('--seed', type=int, default=0, help='dataset random seed')
+    parser.add_argument('--no-generate', action='store_true', help='benchmark the data already there')
+    parser.add_argument('--requests', type=int, default=20, help='timed requests per route and encoding')
+    parser.add_argument('--warmup', type=int, default=2, help='untimed requests per route and encoding first')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        if not args.no_generate:
+            generate(args.shows, seed=args.seed)
+        fx = Fixture(0)
+
+    client = app.test_client()
+    header = f'{"route":32}' + ''.join(f' {encoding + " bytes":>13} ' for encoding in ENCODINGS) + \
+        ''.join(f' {encoding + " ms":>11}' for encoding in ENCODINGS) + \
+        ''.join(f' {encoding + " +ms":>9}' for encoding in ENCODINGS[1:])
+    print(header)
+    totals = {encoding: {'bytes': 0, 'cpu_ms': 0} for encoding in ENCODINGS}
+    for method, rule, url, _ in routes(fx):
+        if method != 'GET':
+            continue
+        results = {encoding: measure(client, url, encoding, args.requests, args.warmup)
+                   for encoding in ENCODINGS}
+        for encoding, result in results.items():
+            totals[encoding]['bytes'] += result['bytes']
+            totals[encoding]['cpu_ms'] += result['cpu_ms']
+        # Responses under the size threshold, or of other types, went out
+        # as they were: marked with an asterisk.
+        line = f'{rule:32}' + ''.join(
+            f' {result["bytes"]:13.0f}{" " if result["encoding"] == encoding else "*"}'
+            for encoding, result in results.items())
+        line += ''.join(f' {result["cpu_ms"]:11.2f}' for result in results.values())
+        line += ''.join(f' {results[encoding]["cpu_ms"] - results["identity"]["cpu_ms"]:+9.2f}'
+                        for encoding in ENCODINGS[1:])
+        print(line)
+
+    identity = totals['identity']
+    print()
+    for encoding in ENCODINGS[1:]:
+        total = totals[encoding]
+        print(f'{encoding}: {total["bytes"] / identity["bytes"] * 100:.1f}% of the identity bytes, '
+              f'{total["cpu_ms"] - identity["cpu_ms"]:+.2f} ms CPU summed over one request per route '
+              f'({(total["cpu_ms"] / identity["cpu_ms"] - 1) * 100:+.1f}%).')
+
+
+if __name__ == '__main__':
+    main()
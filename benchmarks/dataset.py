@@ -0,0 +1,190 @@
+"""Fills the database with a reproducible synthetic venue/artist/show dataset.
+
+Cities and genres follow skewed (Zipf-like) distributions, so a handful of
+areas and genres hold most venues and artists, and popular artists play
+far more shows than the long tail, as on the real site. Shows are spread
+over the past two years and the next one. The same --seed always produces
+the same rows. Rows are written in batches through the bulk importer's
+writer (COPY on PostgreSQL), bypassing form validation, into the database
+configured for the app.
+
+    python -m benchmarks.dataset --shows 100000 [--venues N] [--artists N] [--seed 0]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from app import app, db, counters_maintained_by_database, refresh_show_counts
+from forms import VenueForm
+from importer import write_batch
+from models import Venue, Artist, Show
+
+# By rough size of their live music scene.
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'), ('Nashville', 'TN'),
+    ('Austin', 'TX'), ('San Francisco', 'CA'), ('Seattle', 'WA'), ('New Orleans', 'LA'),
+    ('Atlanta', 'GA'), ('Boston', 'MA'), ('Denver', 'CO'), ('Philadelphia', 'PA'),
+    ('Portland', 'OR'), ('Minneapolis', 'MN'), ('Detroit', 'MI'), ('Miami', 'FL'),
+    ('Houston', 'TX'), ('Dallas', 'TX'), ('Memphis', 'TN'), ('Las Vegas', 'NV'),
+    ('Washington', 'DC'), ('Baltimore', 'MD'), ('Phoenix', 'AZ'), ('San Diego', 'CA'),
+    ('Kansas City', 'MO'), ('St. Louis', 'MO'), ('Pittsburgh', 'PA'), ('Cleveland', 'OH'),
+    ('Salt Lake City', 'UT'), ('Asheville', 'NC'), ('Athens', 'GA'), ('Omaha', 'NE'),
+]
+
+GENRES = [genre for genre, _ in VenueForm.genres.kwargs['choices']]
+
+# Most popular first; the rest follow in form order.
+GENRE_POPULARITY = ['Rock n Roll', 'Pop', 'Hip-Hop', 'Alternative', 'Electronic', 'R&B',
+                    'Country', 'Jazz', 'Punk', 'Folk', 'Blues', 'Heavy Metal', 'Soul']
+
+WORDS = ['Blue', 'Velvet', 'Electric', 'Golden', 'Midnight', 'Silver', 'Crimson', 'Wild',
+         'Lucky', 'Broken', 'Neon', 'Hollow', 'Iron', 'Paper', 'Echo', 'Stone', 'Moon',
+         'Fox', 'River', 'Static', 'Ghost', 'Honey', 'Thunder', 'Canyon', 'Harbor']
+VENUE_KINDS = ['Hall', 'Lounge', 'Room', 'Theatre', 'Club', 'Tavern', 'Ballroom', 'Stage']
+ARTIST_KINDS = ['Band', 'Collective', 'Trio', 'Quartet', 'Orchestra', 'Project', 'Kids', 'Brothers']
+
+
+def zipf_weights(n, s=1.1):
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def cumulative(weights):
+    # random.choices() bisects cumulative weights, rather than summing plain
+    # weights again on every call.
+    return list(accumulate(weights))
+
+
+class Generator(object):
+
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+        self.city_weights = cumulative(zipf_weights(len(CITIES)))
+        ranked = GENRE_POPULARITY + [genre for genre in GENRES if genre not in GENRE_POPULARITY]
+        self.genres = ranked
+        self.genre_weights = cumulative(zipf_weights(len(ranked), s=0.8))
+
+    def name(self, n, kinds):
+        words = self.random.sample(WORDS, 2)
+        return f'The {words[0]} {words[1]} {self.random.choice(kinds)} {n}'
+
+    def pick_genres(self, most):
+        count = self.random.randint(1, most)
+        picked = set()
+        while len(picked) < count:
+            picked.add(self.random.choices(self.genres, cum_weights=self.genre_weights)[0])
+        return sorted(picked)
+
+    def phone(self):
+        return f'{self.random.randint(200, 999)}-{self.random.randint(200, 999)}-{self.random.randint(0, 9999):04d}'
+
+    def venue(self, n, now):
+        city, state = self.random.choices(CITIES, cum_weights=self.city_weights)[0]
+        slug = f'venue{n}'
+        return {
+            'name': self.name(n, VENUE_KINDS),
+            'genres': self.pick_genres(3),
+            'address': f'{self.random.randint(1, 9999)} {self.random.choice(WORDS)} St',
+            'city': city,
+            'state': state,
+            'phone': self.phone(),
+            'website_link': f'https://{slug}.example.com',
+            'facebook_link': f'https://www.facebook.com/{slug}',
+            'seeking_talent': self.random.random() < 0.3,
+            'seeking_description': 'Looking for local acts.',
+            'image_link': f'https://images.example.com/{slug}.jpg',
+            'upcoming_shows_count': 0,
+            'past_shows_count': 0,
+            'updated_at': now,
+        }
+
+    def artist(self, n, now):
+        city, state = self.random.choices(CITIES, cum_weights=self.city_weights)[0]
+        slug = f'artist{n}'
+        return {
+            'name': self.name(n, ARTIST_KINDS),
+            'genres': self.pick_genres(2),
+            'city': city,
+            'state': state,
+            'phone': self.phone(),
+            'website_link': f'https://{slug}.example.com',
+            'facebook_link': f'https://www.facebook.com/{slug}',
+            'seeking_venue': self.random.random() < 0.4,
+            'seeking_description': 'Looking for gigs.',
+            'image_link': f'https://images.example.com/{slug}.jpg',
+            'upcoming_shows_count': 0,
+            'past_shows_count': 0,
+            'updated_at': now,
+        }
+
+    def show(self, venue_ids, venue_weights, artist_ids, artist_weights, now):
+        start_time = now + timedelta(minutes=self.random.randint(-2 * 525600, 525600))
+        start_time = start_time.replace(minute=0, second=0, microsecond=0)
+        return {
+            'venue_id': self.random.choices(venue_ids, cum_weights=venue_weights)[0],
+            'artist_id': self.random.choices(artist_ids, cum_weights=artist_weights)[0],
+            'start_time': start_time,
+            'upcoming': start_time > now,
+            'updated_at': now,
+        }
+
+
+def _write(model, records, batch_size):
+    for start in range(0, len(records), batch_size):
+        write_batch(model, records[start:start + batch_size])
+        db.session.commit()
+
+
+def generate(shows, venues=None, artists=None, seed=0, batch_size=10000):
+    # Adds the dataset to the configured database and returns
+    # {'venues': n, 'artists': n, 'shows': n}.
+    venues = venues or max(1, shows // 20)
+    artists = artists or max(1, shows // 10)
+    generator = Generator(seed)
+    now = datetime.now()
+
+    _write(Venue, [generator.venue(n, now) for n in range(venues)], batch_size)
+    _write(Artist, [generator.artist(n, now) for n in range(artists)], batch_size)
+
+    venue_ids = [venue_id for venue_id, in db.session.query(Venue.id).order_by(Venue.id)]
+    artist_ids = [artist_id for artist_id, in db.session.query(Artist.id).order_by(Artist.id)]
+    # Popularity is independent of id order.
+    venue_weights = zipf_weights(len(venue_ids), s=0.6)
+    artist_weights = zipf_weights(len(artist_ids), s=0.9)
+    generator.random.shuffle(venue_weights)
+    generator.random.shuffle(artist_weights)
+    venue_weights, artist_weights = cumulative(venue_weights), cumulative(artist_weights)
+
+    for start in range(0, shows, batch_size):
+        count = min(batch_size, shows - start)
+        write_batch(Show, [generator.show(venue_ids, venue_weights, artist_ids, artist_weights, now)
+                           for _ in range(count)])
+        db.session.commit()
+
+    if not counters_maintained_by_database():
+        refresh_show_counts()
+    return {'venues': venues, 'artists': artists, 'shows': shows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shows', type=int, default=10000, help='shows to create (1k to 1M)')
+    parser.add_argument('--venues', type=int, help='venues to create (default: shows / 20)')
+    parser.add_argument('--artists', type=int, help='artists to create (default: shows / 10)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    parser.add_argument('--batch-size', type=int, default=10000, help='rows written per transaction')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        counts = generate(args.shows, args.venues, args.artists, args.seed, args.batch_size)
+        elapsed = time.perf_counter() - started
+    print(f"Generated {counts['venues']} venues, {counts['artists']} artists and "
+          f"{counts['shows']} shows in {elapsed:.2f}s (seed {args.seed}).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Micro-benchmark of the `datetime` Jinja filter, per /shows tile.
+
+Compares the original filter (str() in the controller, dateutil parse and
+babel.dates.format_datetime on every call) with the current one (datetime
+objects, precompiled patterns, memoized results).
+
+    python -m benchmarks.datetime_filter [--tiles 30] [--distinct 30] [--repeat 200]
+"""
+
+import argparse
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+from app import format_datetime
+
+
+def format_datetime_before(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tiles', type=int, default=30, help='tiles rendered per page')
+    parser.add_argument('--distinct', type=int, default=30, help='distinct start times per page')
+    parser.add_argument('--repeat', type=int, default=200, help='pages rendered per measurement')
+    args = parser.parse_args()
+
+    start = datetime(2026, 1, 1, 20, 0)
+    times = [start + timedelta(hours=i % args.distinct) for i in range(args.tiles)]
+    strings = [str(time) for time in times]
+
+    for value, string in zip(times, strings):
+        assert format_datetime(value, 'full') == format_datetime_before(string, 'full')
+
+    def before():
+        for string in strings:
+            format_datetime_before(string, 'full')
+
+    def after_cold():
+        format_datetime.cache_clear()
+        for time in times:
+            format_datetime(time, 'full')
+
+    def after_warm():
+        for time in times:
+            format_datetime(time, 'full')
+
+    tiles = args.tiles * args.repeat
+    print(f'{args.tiles} tiles/page, {args.distinct} distinct start times, {args.repeat} pages')
+    for label, run in (('before', before), ('after, cold memo', after_cold), ('after, warm memo', after_warm)):
+        seconds = min(timeit.repeat(run, number=args.repeat, repeat=5))
+        print(f'{label:>18}: {seconds / tiles * 1e6:8.2f} us/tile')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""Compares the WSGI and ASGI servers under many concurrent connections.
+
+Starts the app under gunicorn (threaded workers), then under uvicorn
+(asgi.py) with as many worker processes, and keeps --connections keep-alive
+connections busy against each for --duration seconds, cycling through the
+read paths: list pages, searches, detail pages and the JSON API. Reports
+requests per second, latency percentiles and failed requests per server.
+
+Both servers run as separate processes on the database configured for the
+app, so it must be one they can share: PostgreSQL, or a SQLite file. The
+dataset is generated into it unless --no-generate is given. The load
+generator shares the machine with the servers; compare the two rows with
+each other rather than with production numbers.
+
+    python -m benchmarks.load [--connections 500] [--duration 30] [--workers 4]
+                              [--threads 8] [--shows 10000] [--servers wsgi asgi]
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import secrets
+import subprocess
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from urllib.parse import quote, urlencode
+
+from sqlalchemy.engine import make_url
+
+from app import app, db
+from benchmarks.dataset import generate
+from benchmarks.run import Fixture, percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'wsgi': lambda args, port: ['gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}',
+                                '--workers', str(args.workers), '--threads', str(args.threads),
+                                '--backlog', '2048', '--log-level', 'warning'],
+    'asgi': lambda args, port: ['uvicorn', 'asgi:application', '--host', '127.0.0.1', '--port', str(port),
+                                '--workers', str(args.workers), '--backlog', '2048', '--log-level', 'warning'],
+}
+
+_CSRF_TOKEN = re.compile(rb'name="csrf_token" value="([^"]+)"')
+
+
+def read_paths(fx):
+    # (method, path, form fields)
+    soon = (datetime.now() + timedelta(days=7)).isoformat(timespec='seconds')
+    return [
+        ('GET', '/venues', None),
+        ('POST', '/venues/search', {'search_term': 'blue'}),
+        ('GET', f'/venues/{fx.venue_id}', None),
+        ('GET', '/artists', None),
+        ('POST', '/artists/search', {'search_term': 'moon'}),
+        ('GET', f'/artists/{fx.artist_id}', None),
+        ('GET', '/shows', None),
+        ('GET', '/genres/' + quote('Rock n Roll'), None),
+        ('GET', '/api/autocomplete?' + urlencode({'type': 'venue', 'q': 'the b'}), None),
+        ('GET', '/api/venues?' + urlencode({'city': fx.city, 'state': fx.state}), None),
+        ('GET', '/api/artists?' + urlencode({'state': fx.state}), None),
+        ('GET', '/api/shows?' + urlencode({'to': soon}), None),
+    ]
+
+
+class Connection(object):
+    # One keep-alive HTTP/1.1 connection, with the session cookie and CSRF
+    # token the searches need, as a separate browser would have.
+
+    def __init__(self, port):
+        self.port = port
+        self.writer = None
+        self.cookie = None
+        self.csrf_token = ''
+
+    async def open(self):
+        self.close()
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+        status, body = await self.request('GET', '/venues/create')
+        match = _CSRF_TOKEN.search(body)
+        if status != 200 or not match:
+            raise ConnectionError(f'GET /venues/create answered {status} without a CSRF token')
+        self.csrf_token = match.group(1).decode()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    async def request(self, method, path, form=None):
+        headers = [f'{method} {path} HTTP/1.1', f'Host: 127.0.0.1:{self.port}']
+        body = b''
+        if form is not None:
+            body = urlencode(dict(form, csrf_token=self.csrf_token)).encode()
+            headers.append('Content-Type: application/x-www-form-urlencoded')
+        headers.append(f'Content-Length: {len(body)}')
+        if self.cookie:
+            headers.append(f'Cookie: {self.cookie}')
+        self.writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body)
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('connection closed by the server')
+        status = int(status_line.split()[1])
+        length, chunked, keep_alive = None, False, True
+        while True:
+            line = (await self.reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            name, value = name.lower(), value.strip()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'transfer-encoding':
+                chunked = 'chunked' in value.lower()
+            elif name == 'connection':
+                keep_alive = value.lower() != 'close'
+            elif name == 'set-cookie' and value.startswith('session='):
+                self.cookie = value.split(';', 1)[0]
+
+        if chunked:
+            body = b''
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                body += chunk[:-2]
+        elif length is not None:
+            body = await self.reader.readexactly(length)
+        else:
+            body = await self.reader.read()
+            keep_alive = False
+        if not keep_alive:
+            self.close()
+        return status, body
+
+
+async def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def load(port, paths, connections, warmup, duration):
+    # Returns (latencies of requests completed within the measured window,
+    # Counter of failures by status or error).
+    clients = [Connection(port) for _ in range(connections)]
+    await asyncio.gather(*(client.open() for client in clients))
+
+    measuring_from = time.perf_counter() + warmup
+    until = measuring_from + duration
+    latencies, failures = [], Counter()
+
+    async def run(client, offset):
+        i = offset
+        while time.perf_counter() < until:
+            method, path, form = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                if client.writer is None:
+                    await client.open()
+                status, _ = await client.request(method, path, form)
+            except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+                client.close()
+                if started >= measuring_from:
+                    failures[type(e).__name__] += 1
+                await asyncio.sleep(0.1)
+                continue
+            if started >= measuring_from:
+                if status >= 400:
+                    failures[status] += 1
+                else:
+                    latencies.append(time.perf_counter() - started)
+        client.close()
+
+    await asyncio.gather(*(run(client, offset) for offset, client in enumerate(clients)))
+    return latencies, failures
+
+
+def benchmark(server, args, paths):
+    port = args.port
+    # Worker processes must share the key that signs session cookies.
+    env = dict(os.environ, FYYUR_SECRET_KEY=os.environ.get('FYYUR_SECRET_KEY') or secrets.token_hex(32))
+    process = subprocess.Popen(SERVERS[server](args, port), cwd=ROOT, env=env)
+    try:
+        asyncio.run(wait_until_up(port))
+        latencies, failures = asyncio.run(load(port, paths, args.connections, args.warmup, args.duration))
+    finally:
+        process.terminate()
+        process.wait()
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / args.duration,
+        'p50_ms': percentile(latencies, 50) * 1000 if latencies else 0,
+        'p95_ms': percentile(latencies, 95) * 1000 if latencies else 0,
+        'p99_ms': percentile(latencies, 99) * 1000 if latencies else 0,
+        'failures': failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, default=500, help='concurrent keep-alive connections')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds per server')
+    parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds per server first')
+    parser.add_argument('--workers', type=int, default=4, help='server worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='threads per WSGI worker')
+    parser.add_argument('--port', type=int, default=8765, help='port the servers listen on')
+    parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+    parser.add_argument('--shows', type=int, default=10000, help='shows in the generated dataset')
+    parser.add_argument('--seed', type=int, default=0, help='dataset random seed')
+    parser.add_argument('--no-generate', action='store_true', help='benchmark the data already there')
+    args = parser.parse_args()
+
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        parser.error('the servers cannot share an in-memory database; '
+                     'set FYYUR_DATABASE_URL to PostgreSQL or a SQLite file')
+
+    with app.app_context():
+        db.create_all()
+        if not args.no_generate:
+            generate(args.shows, seed=args.seed)
+        fx = Fixture(0)
+        db.engine.dispose()
+    paths = read_paths(fx)
+
+    results = {server: benchmark(server, args, paths) for server in args.servers}
+
+    print(f'\n{args.connections} connections, {args.workers} workers '
+          f'({args.threads} threads each under WSGI), {args.duration:g}s per server')
+    print(f'{"server":8} {"requests":>9} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"failed":>7}')
+    for server, result in results.items():
+        print(f'{server:8} {result["requests"]:9} {result["rps"]:8.1f} {result["p50_ms"]:8.1f} '
+              f'{result["p95_ms"]:8.1f} {result["p99_ms"]:8.1f} {sum(result["failures"].values()):7}')
+        if result['failures']:
+            print('         failed: ' + ', '.join(f'{count}x {reason}' for reason, count
+                                                 in result['failures'].most_common()))
+    if 'wsgi' in results and 'asgi' in results and results['wsgi']['rps']:
+        print(f'\nASGI throughput is {results["asgi"]["rps"] / results["wsgi"]["rps"]:.2f}x WSGI.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""Drives every route through the Flask test client and reports its cost.
+
+For each route: p50/p95/p99 latency over --requests requests (after a
+short warm-up), SQL statements per request, and the peak memory Python
+allocated while serving it (measured in a separate, shorter pass, since
+tracing allocations slows everything down). Routes the app registers but
+this runner does not know about are reported, so new ones get added here.
+
+The dataset is generated into the database configured for the app unless
+--no-generate is given; point it at a scratch database.
+
+    python -m benchmarks.run [--shows 10000] [--seed 0] [--requests 50]
+                             [--save baseline.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import app, db, venue_page_cache, artist_page_cache
+from benchmarks.dataset import Generator, generate
+from models import Venue, Artist, Show
+
+FORM_LINKS = {
+    'website_link': 'https://bench.example.com',
+    'facebook_link': 'https://www.facebook.com/bench',
+    'image_link': 'https://images.example.com/bench.jpg',
+}
+
+
+class Fixture(object):
+    # Ids the routes are exercised with: the busiest venue and
+    # artist, so detail pages are measured at their worst, and one spare
+    # venue and artist per DELETE request.
+
+    def __init__(self, requests):
+        self.venue_id = db.session.query(Show.venue_id) \
+            .group_by(Show.venue_id).order_by(db.func.count().desc()).limit(1).scalar()
+        self.artist_id = db.session.query(Show.artist_id) \
+            .group_by(Show.artist_id).order_by(db.func.count().desc()).limit(1).scalar()
+        venue = db.session.get(Venue, self.venue_id)
+        self.city, self.state = venue.city, venue.state
+
+        generator = Generator(seed=requests)
+        now = datetime.utcnow()
+        spare_venues = [Venue(**generator.venue(n, now)) for n in range(requests)]
+        spare_artists = [Artist(**generator.artist(n, now)) for n in range(requests)]
+        db.session.add_all(spare_venues + spare_artists)
+        db.session.commit()
+        self._spare_venue_ids = iter([venue.id for venue in spare_venues])
+        self._spare_artist_ids = iter([artist.id for artist in spare_artists])
+        db.session.close()
+
+    def next_spare_venue_id(self):
+        return next(self._spare_venue_ids)
+
+    def next_spare_artist_id(self):
+        return next(self._spare_artist_ids)
+
+
+def venue_form(i):
+    return dict(FORM_LINKS, name=f'Bench Venue {i}', city='San Francisco', state='CA',
+                address='1 Bench St', phone='415-555-0100', genres=['Jazz', 'Folk'],
+                seeking_description='Looking for benchmarks.')
+
+
+def artist_form(i):
+    return dict(FORM_LINKS, name=f'Bench Artist {i}', city='San Francisco', state='CA',
+                phone='415-555-0100', genres=['Jazz'], seeking_description='Looking for benchmarks.')
+
+
+def routes(fx):
+    # (method, rule as registered, url for request i, form data for request i)
+    soon = (datetime.now() + timedelta(days=7)).isoformat(timespec='seconds')
+    later = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
+    return [
+        ('GET', '/', lambda i: '/', None),
+        ('GET', '/venues', lambda i: '/venues', None),
+        ('POST', '/venues/search', lambda i: '/venues/search', lambda i: {'search_term': 'blue'}),
+        ('GET', '/venues/<int:venue_id>', lambda i: f'/venues/{fx.venue_id}', None),
+        ('GET', '/venues/create', lambda i: '/venues/create', None),
+        ('POST', '/venues/create', lambda i: '/venues/create', venue_form),
+        ('DELETE', '/venues/<int:venue_id>', lambda i: f'/venues/{fx.next_spare_venue_id()}', None),
+        ('GET', '/artists', lambda i: '/artists', None),
+        ('POST', '/artists/search', lambda i: '/artists/search', lambda i: {'search_term': 'moon'}),
+        ('GET', '/artists/<int:artist_id>', lambda i: f'/artists/{fx.artist_id}', None),
+        ('GET', '/artists/<int:artist_id>/edit', lambda i: f'/artists/{fx.artist_id}/edit', None),
+        ('POST', '/artists/<int:artist_id>/edit', lambda i: f'/artists/{fx.artist_id}/edit', artist_form),
+        ('GET', '/venues/<int:venue_id>/edit', lambda i: f'/venues/{fx.venue_id}/edit', None),
+        ('POST', '/venues/<int:venue_id>/edit', lambda i: f'/venues/{fx.venue_id}/edit', venue_form),
+        ('GET', '/artists/create', lambda i: '/artists/create', None),
+        ('POST', '/artists/create', lambda i: '/artists/create', artist_form),
+        ('DELETE', '/artists/<int:artist_id>', lambda i: f'/artists/{fx.next_spare_artist_id()}', None),
+        ('GET', '/genres/<name>', lambda i: '/genres/Rock n Roll', None),
+        ('GET', '/shows', lambda i: '/shows', None),
+        ('GET', '/shows/create', lambda i: '/shows/create', None),
+        ('POST', '/shows/create', lambda i: '/shows/create',
+         lambda i: {'artist_id': fx.artist_id, 'venue_id': fx.venue_id, 'start_time': later}),
+        ('GET', '/api/autocomplete', lambda i: '/api/autocomplete?type=venue&q=the b', None),
+        ('GET', '/api/shows', lambda i: f'/api/shows?to={soon}', None),
+        ('GET', '/api/venues', lambda i: f'/api/venues?city={fx.city}&state={fx.state}', None),
+        ('GET', '/api/artists', lambda i: f'/api/artists?state={fx.state}', None),
+        ('GET', '/metrics', lambda i: '/metrics', None),
+    ]
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+class QueryCounter(object):
+
+    def __init__(self):
+        self.count = 0
+        event.listen(Engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def run(client, fx, requests, warmup, memory_requests, cold):
+    queries = QueryCounter()
+    results = {}
+
+    def request(method, url, data, i):
+        if cold:
+            venue_page_cache.clear()
+            artist_page_cache.clear()
+        response = client.open(url(i), method=method, data=data(i) if data else None)
+        response.get_data()
+        if method != 'GET':
+            with client.session_transaction() as session:
+                session.pop('_flashes', None)
+        return response
+
+    for method, rule, url, data in routes(fx):
+        key = f'{method} {rule}'
+        for i in range(warmup):
+            request(method, url, data, i)
+
+        latencies = []
+        statuses = set()
+        queries_before = queries.count
+        for i in range(requests):
+            started = time.perf_counter()
+            response = request(method, url, data, i)
+            latencies.append(time.perf_counter() - started)
+            statuses.add(response.status_code)
+        queries_per_request = (queries.count - queries_before) / requests
+
+        tracemalloc.start()
+        for i in range(memory_requests):
+            request(method, url, data, i)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results[key] = {
+            'requests': requests,
+            'status': sorted(statuses),
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'queries_per_request': queries_per_request,
+            'peak_memory_kib': peak / 1024,
+        }
+    return results
+
+
+def uncovered_routes(fx):
+    covered = {(method, rule) for method, rule, _, _ in routes(fx)}
+    return sorted(f'{method} {rule.rule}' for rule in app.url_map.iter_rules()
+                  if rule.endpoint not in ('static', 'built_asset')
+                  for method in rule.methods - {'HEAD', 'OPTIONS'}
+                  if (method, rule.rule) not in covered)
+
+
+def report(results, baseline=None):
+    print(f'{"route":40} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"queries":>8} {"peak KiB":>9}')
+    for key, result in results.items():
+        line = (f'{key:40} {result["p50_ms"]:8.2f} {result["p95_ms"]:8.2f} {result["p99_ms"]:8.2f} '
+                f'{result["queries_per_request"]:8.1f} {result["peak_memory_kib"]:9.0f}')
+        if baseline and key in baseline:
+            before = baseline[key]
+            change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            line += f'   p95 {change:+.0f}%, queries {before["queries_per_request"]:.1f} -> {result["queries_per_request"]:.1f}'
+        print(line)
+
+
+def regressions(results, baseline, tolerance, slack):
+    # Routes whose p95 grew by more than `tolerance` percent and `slack`
+    # milliseconds (so scheduler jitter on millisecond routes is not taken
+    # for a slowdown), or that now run more statements per request than in
+    # the baseline.
+    found = []
+    for key, result in results.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        if result['queries_per_request'] > before['queries_per_request'] + 0.01:
+            found.append(f'{key}: {before["queries_per_request"]:.1f} -> '
+                         f'{result["queries_per_request"]:.1f} queries per request')
+        if result['p95_ms'] > max(before['p95_ms'] * (1 + tolerance / 100), before['p95_ms'] + slack):
+            found.append(f'{key}: p95 {before["p95_ms"]:.2f} -> {result["p95_ms"]:.2f} ms')
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shows', type=int, default=10000, help='shows in the generated dataset')
+    parser.add_argument('--seed', type=int, default=0, help='dataset random seed')
+    parser.add_argument('--no-generate', action='store_true', help='benchmark the data already there')
+    parser.add_argument('--requests', type=int, default=50, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed requests per route first')
+    parser.add_argument('--memory-requests', type=int, default=5, help='requests per route traced for memory')
+    parser.add_argument('--cold', action='store_true', help='clear the page caches before every request')
+    parser.add_argument('--save', metavar='PATH', help='write the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare against a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=20,
+                        help='allowed p95 slowdown against the baseline, in percent')
+    parser.add_argument('--slack', type=float, default=5,
+                        help='p95 slowdown in milliseconds always allowed against the baseline')
+    args = parser.parse_args()
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        if not args.no_generate:
+            generate(args.shows, seed=args.seed)
+        fx = Fixture(args.warmup + args.requests + args.memory_requests)
+        dialect = db.engine.dialect.name
+
+    client = app.test_client()
+    results = run(client, fx, args.requests, args.warmup, args.memory_requests, args.cold)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['routes']
+    report(results, baseline)
+
+    missing = uncovered_routes(fx)
+    if missing:
+        print('\nNot benchmarked: ' + ', '.join(missing))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'meta': {
+                    'date': datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'database': dialect,
+                    'shows': None if args.no_generate else args.shows,
+                    'seed': args.seed,
+                    'requests': args.requests,
+                    'cold': args.cold,
+                },
+                'routes': results,
+            }, f, indent=2)
+        print(f'\nBaseline saved to {args.save}.')
+
+    if baseline:
+        found = regressions(results, baseline, args.tolerance, args.slack)
+        if found:
+            print('\nRegressions:\n  ' + '\n  '.join(found))
+            sys.exit(1)
+        print('\nNo regressions against the baseline.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import session
+
+#----------------------------------------------------------------------------#
+# In-process caches.
+#----------------------------------------------------------------------------#
+
+_missing = object()
+
+
+class LRUCache(object):
+    # Thread-safe, size-bounded least-recently-used cache. Entries older than
+    # `ttl` seconds are treated as missing, so values cached in one worker
+    # process go stale on their own after writes made through another one.
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _missing)
+            if entry is not _missing:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def cached_page(cache):
+    # Serves a view's rendered HTML from `cache`, keyed by its single URL
+    # argument. Pages are neither served from nor stored in the cache while
+    # flashed messages are pending, since the layout renders them inline.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if '_flashes' in session:
+                return view(**kwargs)
+            (key,) = kwargs.values()
+            html = cache.get(key)
+            if html is None:
+                html = view(**kwargs)
+                cache.set(key, html)
+            return html
+        return wrapper
+    return decorator
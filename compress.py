@@ -0,0 +1,129 @@
+import zlib
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, parse_set_header
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#----------------------------------------------------------------------------#
+# Response compression.
+#----------------------------------------------------------------------------#
+
+# WSGI middleware that gzip- or Brotli-encodes responses for clients that
+# accept it. Only bodies of the allowed content types qualify, and only
+# when they are at least min_size bytes long or of unknown length (streamed).
+# The body is compressed as the app yields it and flushed through whenever
+# flush_size bytes have gone in since the last flush, so a streamed response
+# still goes out as it is produced, without paying for a flush per row.
+# Responses that already carry a Content-Encoding (the precompressed built
+# assets) pass through untouched.
+
+# Statuses without a body, or whose body is a byte range of the identity one.
+_UNCOMPRESSED_STATUSES = (204, 206, 304)
+
+
+class _GzipEncoder(object):
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk):
+        return self._compressor.compress(chunk)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder(object):
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk):
+        return self._compressor.process(chunk)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class CompressionMiddleware(object):
+
+    def __init__(self, app, min_size=1024, mimetypes=('text/html', 'application/json'),
+                 level=6, brotli_quality=4, flush_size=16384):
+        self.app = app
+        self.min_size = min_size
+        self.mimetypes = set(mimetypes)
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.flush_size = flush_size
+
+    def _encoding(self, environ):
+        accepted = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING'))
+        if brotli is not None and accepted['br'] and accepted['br'] >= accepted['gzip']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    def _compressible(self, status, headers):
+        if int(status.split(' ', 1)[0]) in _UNCOMPRESSED_STATUSES or 'Content-Encoding' in headers:
+            return False
+        if headers.get('Content-Type', '').split(';', 1)[0].strip() not in self.mimetypes:
+            return False
+        length = headers.get('Content-Length')
+        return length is None or int(length) >= self.min_size
+
+    def __call__(self, environ, start_response):
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return self.app(environ, start_response)
+        encoding = self._encoding(environ)
+        encoder = []
+
+        def compressing_start_response(status, headers, exc_info=None):
+            headers = Headers(headers)
+            if self._compressible(status, headers):
+                # Cached copies must be keyed on what the client accepts,
+                # unless the app said so already (or that they vary on all).
+                vary = parse_set_header(headers.get('Vary'))
+                if '*' not in vary and 'Accept-Encoding' not in vary:
+                    vary.add('Accept-Encoding')
+                    headers.set('Vary', vary.to_header())
+                if encoding:
+                    encoder.append(_BrotliEncoder(self.brotli_quality) if encoding == 'br'
+                                   else _GzipEncoder(self.level))
+                    headers.set('Content-Encoding', encoding)
+                    headers.remove('Content-Length')
+                    # The encoded body is not byte-for-byte the one a strong
+                    # validator was computed for.
+                    etag = headers.get('ETag')
+                    if etag and not etag.startswith('W/'):
+                        headers.set('ETag', 'W/' + etag)
+            return start_response(status, headers.to_wsgi_list(), exc_info)
+
+        app_iter = self.app(environ, compressing_start_response)
+        if not encoder:
+            return app_iter
+        # Closes the app's iterable even if the server never starts reading.
+        return ClosingIterator(self._compress(app_iter, encoder[0]), getattr(app_iter, 'close', None))
+
+    def _compress(self, app_iter, encoder):
+        pending = 0
+        for chunk in app_iter:
+            compressed = encoder.compress(chunk)
+            pending += len(chunk)
+            if pending >= self.flush_size:
+                compressed += encoder.flush()
+                pending = 0
+            if compressed:
+                yield compressed
+        yield encoder.finish()
@@ -0,0 +1,60 @@
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import make_response, request, session
+
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#----------------------------------------------------------------------------#
+
+# A view's freshness function returns (validators, last_modified) for the
+# same URL arguments, from a query far cheaper than the page itself: the
+# validators are any values that change whenever the rendered page would.
+# When the client already holds that version the view is not run at all.
+
+
+def make_etag(validators):
+    return hashlib.md5(repr(validators).encode()).hexdigest()
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        # HTTP dates have whole-second resolution.
+        last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional(freshness):
+    # Adds a weak ETag and Last-Modified to the view's responses and answers
+    # 304 Not Modified to clients that already hold the current version.
+    # Pages rendered while flashed messages are pending are left alone, since
+    # the layout renders them inline.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if '_flashes' in session:
+                return view(**kwargs)
+            current = freshness(**kwargs)
+            if current is None:
+                # Nothing to validate against (e.g. a missing venue): let the
+                # view produce its own response.
+                return view(**kwargs)
+            validators, last_modified = current
+            etag = make_etag(validators)
+
+            if _not_modified(etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(**kwargs))
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            # Shared caches may keep the page, but must revalidate each use.
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,40 @@
+from sqlalchemy import JSON, DateTime, String
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import TypeDecorator
+
+#----------------------------------------------------------------------------#
+# Portable column types.
+#----------------------------------------------------------------------------#
+
+
+class StringList(TypeDecorator):
+    # A list of strings: a native text[] on PostgreSQL, so existing data,
+    # COPY literals and array operators keep working, and a JSON array on
+    # every other backend. Python always sees a list.
+    impl = JSON
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.ARRAY(String))
+        return dialect.type_descriptor(JSON())
+
+
+class utcnow(FunctionElement):
+    # The current UTC time as a naive timestamp, the way datetime.utcnow()
+    # gives it in Python. CURRENT_TIMESTAMP is already UTC on SQLite, but on
+    # PostgreSQL it follows the session's time zone.
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _compile_utcnow(element, compiler, **kw):
+    return 'CURRENT_TIMESTAMP'
+
+
+@compiles(utcnow, 'postgresql')
+def _compile_utcnow_postgresql(element, compiler, **kw):
+    return "timezone('utc', CURRENT_TIMESTAMP)"
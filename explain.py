@@ -0,0 +1,123 @@
+import re
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import app, db, venue_page_cache, artist_page_cache, autocomplete_cache
+from metrics import fingerprint
+from models import Show
+
+#----------------------------------------------------------------------------#
+# Index report.
+#----------------------------------------------------------------------------#
+
+# Requests every read-only route the benchmark runner knows about through the
+# test client, records the SELECTs each one runs, and asks the database for
+# their plans: EXPLAIN (FORMAT JSON) on PostgreSQL, EXPLAIN QUERY PLAN on
+# SQLite. Any full scan of a table is reported with the statement that
+# caused it, and so is any walk of a whole index: an index scan with no
+# condition and no LIMIT to stop it reads every entry, even when it spares
+# the table. Small tables are often scanned on purpose, so PostgreSQL's row
+# estimate is shown with each scan.
+
+SUPPORTED_DIALECTS = ('postgresql', 'sqlite')
+
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?( USING .*)?$')
+_LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+
+
+class StatementRecorder(object):
+
+    def __init__(self):
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(Engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(Engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            self.statements.append((statement, parameters))
+
+
+def _postgresql_scans(plan, limited=False):
+    node = plan.get('Node Type')
+    if node == 'Seq Scan':
+        yield plan['Relation Name'], f'~{plan["Plan Rows"]} rows'
+    elif node in ('Index Scan', 'Index Only Scan') and 'Index Cond' not in plan and not limited:
+        yield plan['Relation Name'], f'{node} using {plan["Index Name"]}, ~{plan["Plan Rows"]} rows'
+    limited = limited or node == 'Limit'
+    for child in plan.get('Plans', ()):
+        yield from _postgresql_scans(child, limited)
+
+
+def sequential_scans(connection, statement, parameters):
+    # [(table, detail)] for each full table or index scan in the statement's
+    # plan.
+    if connection.dialect.name == 'postgresql':
+        plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+        return list(_postgresql_scans(plan[0]['Plan']))
+    if connection.dialect.name == 'sqlite':
+        # SQLite's plan does not say which scans a LIMIT stops early, so an
+        # index walk only counts when the statement has none at all.
+        limited = bool(_LIMIT.search(statement))
+        scans = []
+        for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters):
+            match = _SQLITE_SCAN.match(row[-1])
+            # Subquery or constant-row scans touch no table.
+            if match and match.group(1) in db.metadata.tables and not (match.group(2) and limited):
+                scans.append((match.group(1), row[-1]))
+        return scans
+    raise RuntimeError(f'No plan reader for {connection.dialect.name}')
+
+
+def read_only_requests():
+    # (method, rule, url, form data) for each read-only route in the
+    # benchmark runner's list, with ids taken from the data already there.
+    from benchmarks.run import Fixture, routes
+
+    endpoints = {(method, rule.rule): rule.endpoint
+                 for rule in app.url_map.iter_rules() for method in rule.methods}
+    fx = Fixture(0)
+    for method, rule, url, data in routes(fx):
+        view = app.view_functions.get(endpoints.get((method, rule)))
+        if method == 'GET' or getattr(view, 'read_only', False):
+            yield method, rule, url(0), data(0) if data else None
+
+
+def index_report():
+    # [(method, rule, statements run, [(statement, scans)])] per route, as
+    # each route is run. The database is checked before any route is.
+    if db.engine.dialect.name not in SUPPORTED_DIALECTS:
+        raise RuntimeError(f'No plan reader for {db.engine.dialect.name}; '
+                           f'index-report supports {", ".join(SUPPORTED_DIALECTS)}.')
+    if db.session.query(Show.id).first() is None:
+        raise RuntimeError('The database has no shows to exercise the routes with.')
+    requests = list(read_only_requests())
+    db.session.close()
+    return _route_reports(requests)
+
+
+def _route_reports(requests):
+    app.config['WTF_CSRF_ENABLED'] = False
+    client = app.test_client()
+    for method, rule, url, data in requests:
+        for cache in (venue_page_cache, artist_page_cache, autocomplete_cache):
+            cache.clear()
+        with StatementRecorder() as recorder:
+            client.open(url, method=method, data=data).get_data()
+
+        flagged, seen = [], set()
+        with db.engine.connect() as connection:
+            for statement, parameters in recorder.statements:
+                key = fingerprint(statement)
+                if key in seen:
+                    continue
+                seen.add(key)
+                scans = sequential_scans(connection, statement, parameters)
+                if scans:
+                    flagged.append((key, scans))
+        yield method, rule, len(recorder.statements), flagged
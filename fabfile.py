@@ -1,14 +1,23 @@
-from fabric.api import local, settings, abort
+from fabric.api import local, settings, shell_env, abort
 from fabric.contrib.console import confirm
 
 # prepare for deployment
 
 
+# The benchmark generates its dataset and deletes rows wherever
+# FYYUR_DATABASE_URL points, so it gets a throwaway in-memory database (and no
+# replica), never the configured one. The tests make their own scratch
+# database.
+
+
 def test():
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        result = local("python -m pytest -q", capture=True)
+        if not result.failed:
+            with shell_env(FYYUR_DATABASE_URL="sqlite://", FYYUR_REPLICA_DATABASE_URL=""):
+                result = local(
+                    "python -m benchmarks.run --compare benchmarks/baseline.json", capture=True
+                )
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
@@ -39,9 +48,7 @@ def heroku():
 
 
 def heroku_test():
-    local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
-    )
+    local("heroku run python -m pytest -q")
 
 
 def deploy():
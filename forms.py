@@ -1,14 +1,16 @@
 from datetime import datetime
 from flask_wtf import FlaskForm as Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, IntegerField
 from wtforms.validators import DataRequired, AnyOf, Regexp, URL
+from wtforms.widgets import HiddenInput
 
 class ShowForm(Form):
-    artist_id = StringField(
-        'artist_id'
+    # Set by the artist and venue pickers on the form page.
+    artist_id = IntegerField(
+        'artist_id', validators=[DataRequired()], widget=HiddenInput()
     )
-    venue_id = StringField(
-        'venue_id'
+    venue_id = IntegerField(
+        'venue_id', validators=[DataRequired()], widget=HiddenInput()
     )
     start_time = DateTimeField(
         'start_time',
@@ -0,0 +1,190 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from werkzeug.datastructures import MultiDict
+
+from app import db
+from forms import VenueForm, ArtistForm, ShowForm
+from models import Venue, Artist, Show, GENRE_LINKS, link_genres
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+
+# Rows are validated with the same forms as the create pages, then written
+# in batches: COPY on PostgreSQL, a single executemany INSERT elsewhere.
+
+IMPORTS = {
+    'venues': (Venue, VenueForm),
+    'artists': (Artist, ArtistForm),
+    'shows': (Show, ShowForm),
+}
+
+
+def read_rows(path):
+    # Yields (line number, row dict) from a .csv or .ndjson/.jsonl file. In
+    # CSV files, multi-valued genres are comma separated within their cell.
+    with open(path, newline='') as f:
+        if path.endswith(('.ndjson', '.jsonl')):
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    yield number, json.loads(line)
+        else:
+            for number, row in enumerate(csv.DictReader(f), 2):
+                if row.get('genres'):
+                    row['genres'] = [genre.strip() for genre in row['genres'].split(',')]
+                yield number, row
+
+
+def _formdata(row):
+    formdata = MultiDict()
+    for key, value in row.items():
+        if value is None or value is False:
+            continue
+        if isinstance(value, list):
+            for item in value:
+                formdata.add(key, item)
+        else:
+            formdata.add(key, str(value))
+    return formdata
+
+
+def validate_row(kind, row):
+    # Returns (record, None) for a valid row, or (None, errors).
+    model, form_class = IMPORTS[kind]
+    if kind == 'shows' and row.get('start_time'):
+        # Accept ISO timestamps (as written by /api/shows) as well as the
+        # form's own 'YYYY-MM-DD HH:MM:SS'.
+        try:
+            row = dict(row, start_time=datetime.fromisoformat(str(row['start_time'])).strftime('%Y-%m-%d %H:%M:%S'))
+        except ValueError:
+            pass
+
+    form = form_class(formdata=_formdata(row), meta={'csrf': False})
+    if not form.validate():
+        return None, form.errors
+
+    if kind == 'shows':
+        # ShowForm has already checked that both ids are integers.
+        record = {
+            'venue_id': form.venue_id.data,
+            'artist_id': form.artist_id.data,
+            'start_time': form.start_time.data,
+        }
+        record['upcoming'] = record['start_time'] > datetime.now()
+        record['updated_at'] = datetime.utcnow()
+        return record, None
+
+    record = {name: field.data for name, field in form._fields.items()
+              if name in model.__table__.columns}
+    record['upcoming_shows_count'] = 0
+    record['past_shows_count'] = 0
+    record['updated_at'] = datetime.utcnow()
+    return record, None
+
+
+def dangling_shows(batch):
+    # Shows whose venue or artist does not exist would fail the whole batch
+    # on the foreign keys, so they are found with two id lookups first.
+    # Returns {line number: errors} for them.
+    venue_ids = {venue_id for venue_id, in db.session.query(Venue.id)
+                 .filter(Venue.id.in_({record['venue_id'] for _, record in batch}))}
+    artist_ids = {artist_id for artist_id, in db.session.query(Artist.id)
+                  .filter(Artist.id.in_({record['artist_id'] for _, record in batch}))}
+    dangling = {}
+    for number, record in batch:
+        errors = {}
+        if record['venue_id'] not in venue_ids:
+            errors['venue_id'] = [f'There is no venue #{record["venue_id"]}.']
+        if record['artist_id'] not in artist_ids:
+            errors['artist_id'] = [f'There is no artist #{record["artist_id"]}.']
+        if errors:
+            dangling[number] = errors
+    return dangling
+
+
+def _copy_value(value):
+    if isinstance(value, list):
+        return '{' + ','.join('"' + item.replace('\\', '\\\\').replace('"', '\\"') + '"'
+                              for item in value) + '}'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return value
+
+
+def _copy_field(value):
+    # COPY's CSV format reads an unquoted empty field as NULL, so every value
+    # is quoted and only None is left bare: empty strings stay empty strings,
+    # as they do through executemany.
+    if value is None:
+        return ''
+    return '"' + str(_copy_value(value)).replace('"', '""') + '"'
+
+
+def write_batch(model, records):
+    if not records:
+        return
+    columns = list(records[0])
+    connection = db.session.connection()
+    if model.__tablename__ in GENRE_LINKS:
+        after_id = db.session.query(db.func.max(model.id)).scalar() or 0
+
+    if connection.dialect.name == 'postgresql':
+        buffer = io.StringIO()
+        for record in records:
+            buffer.write(','.join(_copy_field(record[column]) for column in columns) + '\n')
+        buffer.seek(0)
+        with connection.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {model.__tablename__} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)',
+                buffer
+            )
+    else:
+        connection.execute(model.__table__.insert(), records)
+
+    if model.__tablename__ in GENRE_LINKS:
+        link_genres(model, after_id)
+
+
+def import_rows(kind, rows, batch_size=5000, on_error=None):
+    # Validates and writes `rows` in batches of `batch_size`, committing each
+    # one. Returns (imported, skipped).
+    model, _ = IMPORTS[kind]
+    imported = skipped = 0
+    batch = []
+
+    def flush():
+        nonlocal imported, skipped
+        if kind == 'shows':
+            dangling = dangling_shows(batch)
+            for number, errors in dangling.items():
+                skipped += 1
+                if on_error:
+                    on_error(number, errors)
+            records = [record for number, record in batch if number not in dangling]
+        else:
+            records = [record for _, record in batch]
+        try:
+            write_batch(model, records)
+            db.session.commit()
+        except:
+            db.session.rollback()
+            raise
+        imported += len(records)
+        batch.clear()
+
+    for number, row in rows:
+        record, errors = validate_row(kind, row)
+        if errors:
+            skipped += 1
+            if on_error:
+                on_error(number, errors)
+            continue
+        batch.append((number, record))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    return imported, skipped
@@ -0,0 +1,207 @@
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# Request metrics.
+#----------------------------------------------------------------------------#
+
+# Per-process, in-memory request and SQL timings by endpoint, rendered in the
+# Prometheus text exposition format. Each worker process keeps and exposes
+# its own numbers; the scraper sums them across workers.
+
+# Seconds; the Prometheus client defaults.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class Histogram(object):
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, **labels):
+        for bound, count in zip(self.buckets, self.counts):
+            yield f'{name}_bucket{_labels(**labels, le=bound)} {count}'
+        yield f'{name}_bucket{_labels(**labels, le="+Inf")} {self.count}'
+        yield f'{name}_sum{_labels(**labels)} {self.sum}'
+        yield f'{name}_count{_labels(**labels)} {self.count}'
+
+
+class RequestMetrics(object):
+    # Times every request and the SQL it runs. SQL is captured from cursor
+    # events on every engine, so queries sent to a read replica count too.
+    # Rows streamed after the view returns are not attributed to it.
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.latency = defaultdict(Histogram)
+        self.sql_queries = defaultdict(int)
+        self.sql_seconds = defaultdict(float)
+        self.caches = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def register_cache(self, name, cache):
+        # Exposes the hit/miss counters and size of an LRUCache.
+        self.caches[name] = cache
+
+    def _start_request(self):
+        g.request_started = time.perf_counter()
+        g.sql_queries = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and conn.info.get('query_started'):
+            elapsed = time.perf_counter() - conn.info['query_started'].pop()
+            if 'sql_queries' in g:
+                g.sql_queries.append((statement, elapsed))
+
+    def _finish_request(self, response):
+        if 'request_started' not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_started
+        endpoint = request.endpoint or 'unmatched'
+        queries = g.sql_queries
+        sql_seconds = sum(duration for _, duration in queries)
+
+        with self._lock:
+            self.requests[endpoint, request.method, response.status_code] += 1
+            self.latency[endpoint].observe(elapsed)
+            self.sql_queries[endpoint] += len(queries)
+            self.sql_seconds[endpoint] += sql_seconds
+
+        budget = self.app.config.get('QUERY_BUDGETS', {}).get(endpoint)
+        if budget is not None:
+            check_query_budget(self.app, budget, queries, f'{request.method} {request.path}')
+
+        threshold = self.app.config.get('SLOW_REQUEST_THRESHOLD')
+        if threshold is not None and elapsed >= threshold:
+            self.app.logger.warning(
+                '%s %s took %.1f ms (%d queries, %.1f ms SQL)%s',
+                request.method, request.full_path.rstrip('?'), elapsed * 1000,
+                len(queries), sql_seconds * 1000,
+                ''.join(f'\n  {duration * 1000:8.2f} ms  {" ".join(statement.split())}'
+                        for statement, duration in queries)
+            )
+        return response
+
+    def render(self):
+        lines = []
+
+        def family(name, kind, help):
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            family('fyyur_http_requests_total', 'counter', 'Requests handled, by endpoint, method and status.')
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'fyyur_http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}')
+
+            family('fyyur_http_request_duration_seconds', 'histogram', 'Request wall time, by endpoint.')
+            for endpoint, histogram in sorted(self.latency.items()):
+                lines.extend(histogram.samples('fyyur_http_request_duration_seconds', endpoint=endpoint))
+
+            family('fyyur_sql_queries_total', 'counter', 'SQL statements executed while handling requests, by endpoint.')
+            for endpoint, count in sorted(self.sql_queries.items()):
+                lines.append(f'fyyur_sql_queries_total{_labels(endpoint=endpoint)} {count}')
+
+            family('fyyur_sql_duration_seconds_total', 'counter', 'Time spent in SQL while handling requests, by endpoint.')
+            for endpoint, seconds in sorted(self.sql_seconds.items()):
+                lines.append(f'fyyur_sql_duration_seconds_total{_labels(endpoint=endpoint)} {seconds}')
+
+        family('fyyur_cache_hits_total', 'counter', 'In-process cache hits.')
+        for name, cache in sorted(self.caches.items()):
+            lines.append(f'fyyur_cache_hits_total{_labels(cache=name)} {cache.hits}')
+        family('fyyur_cache_misses_total', 'counter', 'In-process cache misses.')
+        for name, cache in sorted(self.caches.items()):
+            lines.append(f'fyyur_cache_misses_total{_labels(cache=name)} {cache.misses}')
+        family('fyyur_cache_entries', 'gauge', 'Entries currently held by in-process caches.')
+        for name, cache in sorted(self.caches.items()):
+            lines.append(f'fyyur_cache_entries{_labels(cache=name)} {len(cache)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+#----------------------------------------------------------------------------#
+# Query budgets.
+#----------------------------------------------------------------------------#
+
+# A view decorated with @query_budget(n) may run at most n SQL statements;
+# QUERY_BUDGETS = {endpoint: n} in the config does the same for whole
+# requests, decorated or not. Going over raises QueryBudgetExceeded in
+# testing mode or with QUERY_BUDGET_STRICT set, so an N+1 fails the tests,
+# and is only logged otherwise: users never get a 500 for it.
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAMETER_LISTS = re.compile(r'\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,?)+\)')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(statement):
+    # The statement with literals and parameter lists collapsed, so that
+    # the same query issued for different rows reads the same.
+    statement = _LITERALS.sub('?', ' '.join(statement.split()))
+    return _PARAMETER_LISTS.sub('(?)', statement)
+
+
+def check_query_budget(app, budget, queries, where):
+    if len(queries) <= budget:
+        return
+    counts = Counter(fingerprint(statement) for statement, _ in queries)
+    message = f'{where} ran {len(queries)} queries, over its budget of {budget}.' + ''.join(
+        f'\n  {count}x {statement}' for statement, count in counts.most_common() if count > 1)
+    if app.testing or app.config.get('QUERY_BUDGET_STRICT'):
+        raise QueryBudgetExceeded(message)
+    app.logger.warning(message)
+
+
+def query_budget(budget):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if 'sql_queries' not in g:
+                return view(*args, **kwargs)
+            start = len(g.sql_queries)
+            response = view(*args, **kwargs)
+            check_query_budget(current_app, budget, g.sql_queries[start:], f'{view.__name__}()')
+            return response
+        return wrapper
+    return decorator
@@ -6,6 +6,10 @@ from logging.config import fileConfig
 from flask import current_app
 
 from alembic import context
+from sqlalchemy import ARRAY, Column
+from sqlalchemy.ext.compiler import compiles
+
+from models import POSTGRESQL_ONLY_INDEXES
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -26,6 +30,30 @@ config.set_main_option(
         '%', '%%'))
 target_metadata = current_app.extensions['migrate'].db.metadata
 
+
+# Earlier revisions declare `genres` as ARRAY, which only PostgreSQL has;
+# elsewhere it is stored as JSON, like db_types.StringList does.
+@compiles(ARRAY)
+def compile_array_elsewhere(type_, compiler, **kw):
+    return compiler.visit_JSON(type_, **kw)
+
+
+@compiles(ARRAY, 'postgresql')
+def compile_array(type_, compiler, **kw):
+    return compiler.visit_ARRAY(type_, **kw)
+
+# Indexes that only exist on PostgreSQL are created outside the table
+# metadata; autogenerate would otherwise drop them there. SQLAlchemy does not
+# reflect expression indexes (lower(name)) from SQLite, so autogenerate would
+# add those again on every run there.
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ != 'index' or compare_to is not None:
+        return True
+    if reflected:
+        return name not in POSTGRESQL_ONLY_INDEXES
+    return not (context.get_bind().dialect.name == 'sqlite'
+                and not all(isinstance(expression, Column) for expression in object.expressions))
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -74,10 +102,14 @@ def run_migrations_online():
     connectable = current_app.extensions['migrate'].db.get_engine()
 
     with connectable.connect() as connection:
+        # SQLite can only add columns in place; batch mode rebuilds the
+        # table for every other change.
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
             process_revision_directives=process_revision_directives,
+            include_object=include_object,
+            render_as_batch=connection.dialect.name == 'sqlite',
             **current_app.extensions['migrate'].configure_args
         )
 
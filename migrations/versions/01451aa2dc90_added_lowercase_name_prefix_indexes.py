@@ -0,0 +1,32 @@
+"""Added lowercase name prefix indexes for autocomplete
+
+Revision ID: 01451aa2dc90
+Revises: 2129a436482a
+Create Date: 2026-10-18 11:02:47.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '01451aa2dc90'
+down_revision = '2129a436482a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # lower(name) LIKE 'prefix%' can only use a B-tree index built with the
+    # pattern operator class on PostgreSQL.
+    if op.get_bind().dialect.name == 'postgresql':
+        expression = sa.text('lower(name) text_pattern_ops')
+    else:
+        expression = sa.text('lower(name)')
+    op.create_index('ix_venue_name_lower', 'venue', [expression], unique=False)
+    op.create_index('ix_artist_name_lower', 'artist', [expression], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_artist_name_lower', table_name='artist')
+    op.drop_index('ix_venue_name_lower', table_name='venue')
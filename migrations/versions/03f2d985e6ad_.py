@@ -17,6 +17,13 @@ depends_on = None
 
 
 def upgrade():
+    # Autogenerated against a database whose tables had been dropped by hand;
+    # drop them here too so that the chain also runs on a fresh database.
+    existing = sa.inspect(op.get_bind()).get_table_names()
+    for table in ('Venue', 'Artist'):
+        if table in existing:
+            op.drop_table(table)
+
     # ### commands auto generated by Alembic - please adjust! ###
     op.create_table('Artist',
     sa.Column('id', sa.Integer(), nullable=False),
@@ -51,7 +58,6 @@ def upgrade():
 
 
 def downgrade():
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_table('Venue')
-    op.drop_table('Artist')
-    # ### end Alembic commands ###
+    # e1eae7f7ea21 created the same two tables, so they stay as they are; dropping
+    # them left the earlier revisions nothing to downgrade.
+    pass
@@ -18,21 +18,25 @@ depends_on = None
 
 def upgrade():
     # ### commands auto generated by Alembic - please adjust! ###
-    op.alter_column('artist', 'genres',
-               existing_type=postgresql.ARRAY(sa.VARCHAR()),
-               nullable=False)
-    op.alter_column('venue', 'genres',
-               existing_type=postgresql.ARRAY(sa.VARCHAR(length=30)),
-               nullable=False)
+    with op.batch_alter_table('artist') as batch_op:
+        batch_op.alter_column('genres',
+              existing_type=postgresql.ARRAY(sa.VARCHAR()),
+              nullable=False)
+    with op.batch_alter_table('venue') as batch_op:
+        batch_op.alter_column('genres',
+              existing_type=postgresql.ARRAY(sa.VARCHAR(length=30)),
+              nullable=False)
     # ### end Alembic commands ###
 
 
 def downgrade():
     # ### commands auto generated by Alembic - please adjust! ###
-    op.alter_column('venue', 'genres',
-               existing_type=postgresql.ARRAY(sa.VARCHAR(length=30)),
-               nullable=True)
-    op.alter_column('artist', 'genres',
-               existing_type=postgresql.ARRAY(sa.VARCHAR()),
-               nullable=True)
+    with op.batch_alter_table('venue') as batch_op:
+        batch_op.alter_column('genres',
+              existing_type=postgresql.ARRAY(sa.VARCHAR(length=30)),
+              nullable=True)
+    with op.batch_alter_table('artist') as batch_op:
+        batch_op.alter_column('genres',
+              existing_type=postgresql.ARRAY(sa.VARCHAR()),
+              nullable=True)
     # ### end Alembic commands ###
@@ -0,0 +1,61 @@
+"""Added updated_at stamps and table versions
+
+Revision ID: 5e0b7a2c9d14
+Revises: 7c3e9d1f4a52
+Create Date: 2026-10-18 13:40:21.905114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e0b7a2c9d14'
+down_revision = '7c3e9d1f4a52'
+branch_labels = None
+depends_on = None
+
+# Expression indexes SQLAlchemy cannot reflect, which a batch rebuild of
+# their table on SQLite therefore leaves behind.
+SQLITE_EXPRESSION_INDEXES = {'venue': 'ix_venue_name_lower', 'artist': 'ix_artist_name_lower'}
+
+
+def recreate_expression_indexes(tables):
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    existing = {row[0] for row in op.get_bind().execute(
+        sa.text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+    for table in tables:
+        name = SQLITE_EXPRESSION_INDEXES.get(table)
+        if name and name not in existing:
+            op.create_index(name, table, [sa.text('lower(name)')], unique=False)
+
+
+def upgrade():
+    # Existing rows are stamped with the time of the migration. SQLite cannot
+    # add a column with a non-constant default to a table that has rows, so
+    # there the table is rebuilt instead.
+    recreate = 'always' if op.get_bind().dialect.name == 'sqlite' else 'auto'
+    for table in ('venue', 'artist', 'show'):
+        with op.batch_alter_table(table, recreate=recreate) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                          server_default=sa.func.now()))
+    recreate_expression_indexes(('venue', 'artist'))
+
+    op.create_table('table_version',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.execute("INSERT INTO table_version (name, version, updated_at) VALUES "
+               "('venue', 0, CURRENT_TIMESTAMP), ('artist', 0, CURRENT_TIMESTAMP), "
+               "('show', 0, CURRENT_TIMESTAMP)")
+
+
+def downgrade():
+    op.drop_table('table_version')
+    for table in ('show', 'artist', 'venue'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
+    recreate_expression_indexes(('artist', 'venue'))
@@ -0,0 +1,105 @@
+"""Added show count triggers and materialized views
+
+Revision ID: 7c3e9d1f4a52
+Revises: 01451aa2dc90
+Create Date: 2026-10-18 12:14:05.631920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3e9d1f4a52'
+down_revision = '01451aa2dc90'
+branch_labels = None
+depends_on = None
+
+
+APPLY_DELTA = """
+    WITH delta AS ({delta}),
+    venue_delta AS (
+        UPDATE venue SET
+            upcoming_shows_count = coalesce(venue.upcoming_shows_count, 0) + d.upcoming,
+            past_shows_count = coalesce(venue.past_shows_count, 0) + d.past
+        FROM (SELECT venue_id AS id,
+                     sum(CASE WHEN upcoming THEN n ELSE 0 END) AS upcoming,
+                     sum(CASE WHEN upcoming THEN 0 ELSE n END) AS past
+              FROM delta GROUP BY venue_id) AS d
+        WHERE venue.id = d.id AND (d.upcoming <> 0 OR d.past <> 0)
+    )
+    UPDATE artist SET
+        upcoming_shows_count = coalesce(artist.upcoming_shows_count, 0) + d.upcoming,
+        past_shows_count = coalesce(artist.past_shows_count, 0) + d.past
+    FROM (SELECT artist_id AS id,
+                 sum(CASE WHEN upcoming THEN n ELSE 0 END) AS upcoming,
+                 sum(CASE WHEN upcoming THEN 0 ELSE n END) AS past
+          FROM delta GROUP BY artist_id) AS d
+    WHERE artist.id = d.id AND (d.upcoming <> 0 OR d.past <> 0);
+"""
+
+TRIGGERS = {
+    'insert': ('REFERENCING NEW TABLE AS new_shows',
+               'SELECT venue_id, artist_id, upcoming, 1 AS n FROM new_shows'),
+    'update': ('REFERENCING OLD TABLE AS old_shows NEW TABLE AS new_shows',
+               'SELECT venue_id, artist_id, upcoming, 1 AS n FROM new_shows '
+               'UNION ALL SELECT venue_id, artist_id, upcoming, -1 FROM old_shows'),
+    'delete': ('REFERENCING OLD TABLE AS old_shows',
+               'SELECT venue_id, artist_id, upcoming, -1 AS n FROM old_shows'),
+}
+
+
+def upgrade():
+    # Transition tables need PostgreSQL 10+; other backends keep maintaining
+    # the counters from the app.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Bring the hand-maintained counters in line before the triggers take over.
+    for entity in ('venue', 'artist'):
+        op.execute(f"""
+            UPDATE {entity} SET
+                upcoming_shows_count = (SELECT count(*) FROM show
+                    WHERE show.{entity}_id = {entity}.id AND show.upcoming),
+                past_shows_count = (SELECT count(*) FROM show
+                    WHERE show.{entity}_id = {entity}.id AND NOT show.upcoming)
+        """)
+
+    for event, (referencing, delta) in TRIGGERS.items():
+        op.execute(f"""
+            CREATE OR REPLACE FUNCTION show_counts_on_{event}() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                {APPLY_DELTA.format(delta=delta)}
+                RETURN NULL;
+            END $$
+        """)
+        op.execute(f"""
+            CREATE TRIGGER show_counts_{event} AFTER {event.upper()} ON show
+            {referencing} FOR EACH STATEMENT
+            EXECUTE PROCEDURE show_counts_on_{event}()
+        """)
+
+    # The unique indexes are what allow REFRESH MATERIALIZED VIEW CONCURRENTLY.
+    for entity in ('venue', 'artist'):
+        op.execute(f"""
+            CREATE MATERIALIZED VIEW {entity}_show_counts AS
+            SELECT {entity}.id AS {entity}_id,
+                   count(show.id) FILTER (WHERE show.start_time > now()) AS upcoming_shows_count,
+                   count(show.id) FILTER (WHERE show.start_time <= now()) AS past_shows_count
+            FROM {entity} LEFT JOIN show ON show.{entity}_id = {entity}.id
+            GROUP BY {entity}.id
+        """)
+        op.execute(f'CREATE UNIQUE INDEX ix_{entity}_show_counts_{entity}_id '
+                   f'ON {entity}_show_counts ({entity}_id)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for entity in ('artist', 'venue'):
+        op.execute(f'DROP MATERIALIZED VIEW IF EXISTS {entity}_show_counts')
+    for event in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS show_counts_{event} ON show')
+        op.execute(f'DROP FUNCTION IF EXISTS show_counts_on_{event}()')
@@ -0,0 +1,77 @@
+"""Added genre and venue/artist genre link tables
+
+Revision ID: 8d41f6b03e27
+Revises: 5e0b7a2c9d14
+Create Date: 2026-10-18 15:07:52.384610
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41f6b03e27'
+down_revision = '5e0b7a2c9d14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    for entity in ('venue', 'artist'):
+        op.create_table(f'{entity}_genre',
+        sa.Column(f'{entity}_id', sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint([f'{entity}_id'], [f'{entity}.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['genre_id'], ['genre.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint(f'{entity}_id', 'genre_id')
+        )
+        op.create_index(f'ix_{entity}_genre_genre_id_{entity}_id', f'{entity}_genre',
+                        ['genre_id', f'{entity}_id'], unique=False)
+
+    # Data migration: one genre row per distinct name in the arrays, and a
+    # link per (entity, genre) pair.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("""
+            INSERT INTO genre (name)
+            SELECT DISTINCT name FROM (
+                SELECT unnest(genres) AS name FROM venue
+                UNION SELECT unnest(genres) FROM artist
+            ) AS names
+            WHERE name IS NOT NULL
+        """)
+        for entity in ('venue', 'artist'):
+            op.execute(f"""
+                INSERT INTO {entity}_genre ({entity}_id, genre_id)
+                SELECT DISTINCT {entity}.id, genre.id
+                FROM {entity} JOIN genre ON genre.name = ANY({entity}.genres)
+            """)
+    else:
+        # Elsewhere the arrays are JSON text.
+        bind = op.get_bind()
+        rows = {entity: [(entity_id, json.loads(genres) if genres else [])
+                         for entity_id, genres in bind.execute(sa.text(f'SELECT id, genres FROM {entity}'))]
+                for entity in ('venue', 'artist')}
+        names = sorted({name for entity_rows in rows.values() for _, genres in entity_rows for name in genres})
+        if names:
+            op.bulk_insert(sa.table('genre', sa.column('name')), [{'name': name} for name in names])
+        genre_ids = dict((name, genre_id) for genre_id, name in bind.execute(sa.text('SELECT id, name FROM genre')))
+        for entity, entity_rows in rows.items():
+            links = [{f'{entity}_id': entity_id, 'genre_id': genre_ids[name]}
+                     for entity_id, genres in entity_rows for name in set(genres)]
+            if links:
+                op.bulk_insert(sa.table(f'{entity}_genre', sa.column(f'{entity}_id'), sa.column('genre_id')), links)
+
+
+def downgrade():
+    for entity in ('artist', 'venue'):
+        op.drop_index(f'ix_{entity}_genre_genre_id_{entity}_id', table_name=f'{entity}_genre')
+        op.drop_table(f'{entity}_genre')
+    op.drop_table('genre')
@@ -17,6 +17,12 @@ depends_on = None
 
 
 def upgrade():
+    # The old tables go first: SQLite table names are case-insensitive, so
+    # "Artist" and artist cannot exist side by side there.
+    op.drop_table('Show')
+    op.drop_table('Artist')
+    op.drop_table('Venue')
+
     # ### commands auto generated by Alembic - please adjust! ###
     op.create_table('artist',
     sa.Column('id', sa.Integer(), nullable=False),
@@ -59,16 +65,21 @@ def upgrade():
     sa.ForeignKeyConstraint(['venue_id'], ['venue.id'], ),
     sa.PrimaryKeyConstraint('id')
     )
-    op.drop_table('Show')
-    op.drop_table('Artist')
-    op.drop_table('Venue')
     # ### end Alembic commands ###
 
 
 def downgrade():
+    # As in upgrade, the lowercase tables go first. The ids are plain SERIAL
+    # columns: on PostgreSQL that recreates the "Venue_id_seq" style
+    # sequences the old tables used, which were dropped with them, and
+    # SQLite has no nextval() to default to.
+    op.drop_table('show')
+    op.drop_table('venue')
+    op.drop_table('artist')
+
     # ### commands auto generated by Alembic - please adjust! ###
     op.create_table('Venue',
-    sa.Column('id', sa.INTEGER(), server_default=sa.text('nextval(\'"Venue_id_seq"\'::regclass)'), autoincrement=True, nullable=False),
+    sa.Column('id', sa.INTEGER(), autoincrement=True, nullable=False),
     sa.Column('name', sa.VARCHAR(), autoincrement=False, nullable=True),
     sa.Column('genres', postgresql.ARRAY(sa.VARCHAR(length=30)), autoincrement=False, nullable=True),
     sa.Column('address', sa.VARCHAR(length=120), autoincrement=False, nullable=True),
@@ -86,7 +97,7 @@ def downgrade():
     postgresql_ignore_search_path=False
     )
     op.create_table('Artist',
-    sa.Column('id', sa.INTEGER(), server_default=sa.text('nextval(\'"Artist_id_seq"\'::regclass)'), autoincrement=True, nullable=False),
+    sa.Column('id', sa.INTEGER(), autoincrement=True, nullable=False),
     sa.Column('name', sa.VARCHAR(), autoincrement=False, nullable=True),
     sa.Column('genres', postgresql.ARRAY(sa.VARCHAR()), autoincrement=False, nullable=True),
     sa.Column('city', sa.VARCHAR(length=120), autoincrement=False, nullable=True),
@@ -101,7 +112,7 @@ def downgrade():
     postgresql_ignore_search_path=False
     )
     op.create_table('Show',
-    sa.Column('id', sa.INTEGER(), server_default=sa.text('nextval(\'"Show_id_seq"\'::regclass)'), autoincrement=True, nullable=False),
+    sa.Column('id', sa.INTEGER(), autoincrement=True, nullable=False),
     sa.Column('venue_id', sa.INTEGER(), autoincrement=False, nullable=False),
     sa.Column('artist_id', sa.INTEGER(), autoincrement=False, nullable=False),
     sa.Column('start_time', postgresql.TIMESTAMP(), autoincrement=False, nullable=False),
@@ -110,7 +121,4 @@ def downgrade():
     sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], name='Show_venue_id_fkey'),
     sa.PrimaryKeyConstraint('id', name='Show_pkey')
     )
-    op.drop_table('show')
-    op.drop_table('venue')
-    op.drop_table('artist')
     # ### end Alembic commands ###
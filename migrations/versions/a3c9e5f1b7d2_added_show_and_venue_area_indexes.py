@@ -0,0 +1,44 @@
+"""Added show venue/artist/upcoming indexes and a venue area index
+
+Revision ID: a3c9e5f1b7d2
+Revises: 8d41f6b03e27
+Create Date: 2026-10-18 21:14:06.508213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c9e5f1b7d2'
+down_revision = '8d41f6b03e27'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, partial index predicate), the predicate spelled as
+# filter(Show.upcoming) renders on PostgreSQL and on SQLite.
+INDEXES = [
+    ('ix_show_venue_id_start_time', 'show', ['venue_id', 'start_time'], None),
+    ('ix_show_artist_id_start_time', 'show', ['artist_id', 'start_time'], None),
+    ('ix_show_upcoming_start_time', 'show', ['start_time', 'id'], ('upcoming', 'upcoming = 1')),
+    ('ix_venue_state_city', 'venue', ['state', 'city'], None),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # Built without locking out writes to the live tables, which
+        # CONCURRENTLY can only do outside a transaction.
+        with op.get_context().autocommit_block():
+            for name, table, columns, where in INDEXES:
+                op.create_index(name, table, columns, unique=False, postgresql_concurrently=True,
+                                postgresql_where=sa.text(where[0]) if where else None)
+    else:
+        for name, table, columns, where in INDEXES:
+            op.create_index(name, table, columns, unique=False,
+                            sqlite_where=sa.text(where[1]) if where else None)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,30 @@
+"""Added table deletion stamps
+
+Revision ID: b7d3e9f1a2c4
+Revises: f2b6d8a0c5e7
+Create Date: 2026-10-20 09:27:16.538104
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d3e9f1a2c4'
+down_revision = 'f2b6d8a0c5e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # List pages read the last deletion per table here instead of counting
+    # the rows of every table they show.
+    op.create_table('table_deletion',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('table_deletion')
@@ -0,0 +1,57 @@
+"""Replaced table versions with updated_at indexes
+
+Revision ID: c81f4d2a6e39
+Revises: a3c9e5f1b7d2
+Create Date: 2026-10-19 09:12:44.270318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f4d2a6e39'
+down_revision = 'a3c9e5f1b7d2'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venue', 'artist', 'show')
+
+
+def upgrade():
+    # List pages now read each table's count and newest stamp instead of a
+    # shared version row that every write had to lock.
+    op.drop_table('table_version')
+
+    if op.get_bind().dialect.name == 'postgresql':
+        # updated_at is naive UTC, as datetime.utcnow() writes it; now()
+        # follows the session time zone.
+        for table in TABLES:
+            op.alter_column(table, 'updated_at', existing_type=sa.DateTime(),
+                            server_default=sa.text("timezone('utc', CURRENT_TIMESTAMP)"))
+        with op.get_context().autocommit_block():
+            for table in TABLES:
+                op.create_index(f'ix_{table}_updated_at', table, ['updated_at'], unique=False,
+                                postgresql_concurrently=True)
+    else:
+        for table in TABLES:
+            op.create_index(f'ix_{table}_updated_at', table, ['updated_at'], unique=False)
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        op.drop_index(f'ix_{table}_updated_at', table_name=table)
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in reversed(TABLES):
+            op.alter_column(table, 'updated_at', existing_type=sa.DateTime(),
+                            server_default=sa.func.now())
+
+    op.create_table('table_version',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.execute("INSERT INTO table_version (name, version, updated_at) VALUES "
+               "('venue', 0, CURRENT_TIMESTAMP), ('artist', 0, CURRENT_TIMESTAMP), "
+               "('show', 0, CURRENT_TIMESTAMP)")
@@ -17,6 +17,13 @@ depends_on = None
 
 
 def upgrade():
+    # Autogenerated against a database whose tables had been dropped by hand;
+    # drop them here too so that the chain also runs on a fresh database.
+    existing = sa.inspect(op.get_bind()).get_table_names()
+    for table in ('Venue', 'Artist'):
+        if table in existing:
+            op.drop_table(table)
+
     # ### commands auto generated by Alembic - please adjust! ###
     op.create_table('Artist',
     sa.Column('id', sa.Integer(), nullable=False),
@@ -55,3 +62,31 @@ def downgrade():
     op.drop_table('Venue')
     op.drop_table('Artist')
     # ### end Alembic commands ###
+
+    # Back to the tables e3932a55eeb4 created.
+    op.create_table('Artist',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('city', sa.String(length=120), nullable=True),
+    sa.Column('state', sa.String(length=120), nullable=True),
+    sa.Column('phone', sa.String(length=120), nullable=True),
+    sa.Column('genres', sa.String(length=120), nullable=True),
+    sa.Column('image_link', sa.String(length=500), nullable=True),
+    sa.Column('facebook_link', sa.String(length=120), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('Venue',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('genres', sa.ARRAY(sa.String(length=15)), nullable=True),
+    sa.Column('address', sa.String(length=120), nullable=True),
+    sa.Column('city', sa.String(length=120), nullable=True),
+    sa.Column('state', sa.String(length=120), nullable=True),
+    sa.Column('phone', sa.String(length=120), nullable=True),
+    sa.Column('website', sa.String(length=120), nullable=True),
+    sa.Column('facebook_link', sa.String(length=120), nullable=True),
+    sa.Column('seeking_talent', sa.Boolean(), nullable=True),
+    sa.Column('seeking_description', sa.String(length=400), nullable=True),
+    sa.Column('image_link', sa.String(length=500), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
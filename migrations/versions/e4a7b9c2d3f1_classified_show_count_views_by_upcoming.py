@@ -0,0 +1,54 @@
+"""Classified the show count views by the upcoming flag, stamped with refresh time
+
+Revision ID: e4a7b9c2d3f1
+Revises: c81f4d2a6e39
+Create Date: 2026-10-19 10:03:17.552906
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7b9c2d3f1'
+down_revision = 'c81f4d2a6e39'
+branch_labels = None
+depends_on = None
+
+# The views count shows the way the counter columns do, by the upcoming flag
+# the sweeper flips, and record when they were last refreshed.
+NEW_COUNTS = """
+    count(show.id) FILTER (WHERE show.upcoming) AS upcoming_shows_count,
+    count(show.id) FILTER (WHERE NOT show.upcoming) AS past_shows_count,
+    timezone('utc', CURRENT_TIMESTAMP) AS refreshed_at
+"""
+
+OLD_COUNTS = """
+    count(show.id) FILTER (WHERE show.start_time > now()) AS upcoming_shows_count,
+    count(show.id) FILTER (WHERE show.start_time <= now()) AS past_shows_count
+"""
+
+
+def replace_views(counts):
+    for entity in ('venue', 'artist'):
+        op.execute(f'DROP MATERIALIZED VIEW IF EXISTS {entity}_show_counts')
+        op.execute(f"""
+            CREATE MATERIALIZED VIEW {entity}_show_counts AS
+            SELECT {entity}.id AS {entity}_id, {counts}
+            FROM {entity} LEFT JOIN show ON show.{entity}_id = {entity}.id
+            GROUP BY {entity}.id
+        """)
+        op.execute(f'CREATE UNIQUE INDEX ix_{entity}_show_counts_{entity}_id '
+                   f'ON {entity}_show_counts ({entity}_id)')
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    replace_views(NEW_COUNTS)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    replace_views(OLD_COUNTS)
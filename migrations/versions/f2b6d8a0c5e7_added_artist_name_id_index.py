@@ -0,0 +1,31 @@
+"""Added an artist (name, id) index for the /artists listing
+
+Revision ID: f2b6d8a0c5e7
+Revises: e4a7b9c2d3f1
+Create Date: 2026-10-19 10:41:52.904736
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6d8a0c5e7'
+down_revision = 'e4a7b9c2d3f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keyset pages of /artists are ORDER BY name, id ranges; neither the
+    # lower(name) nor the trigram index can serve that order.
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index('ix_artist_name_id', 'artist', ['name', 'id'], unique=False,
+                            postgresql_concurrently=True)
+    else:
+        op.create_index('ix_artist_name_id', 'artist', ['name', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_artist_name_id', table_name='artist')
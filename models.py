@@ -1,11 +1,29 @@
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql, sqlite
+
 from app import db
+from db_types import StringList, utcnow
+
+# The trigram name indexes (see the end of this section) need the pg_trgm
+# extension in place before the tables are created.
+db.event.listen(
+    db.metadata, 'before_create',
+    db.DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
 
 class Venue(db.Model):
     __tablename__ = 'venue'
+    __table_args__ = (
+        # /venues groups venues by area.
+        db.Index('ix_venue_state_city', 'state', 'city'),
+        # Newest stamp, for the list page validators.
+        db.Index('ix_venue_updated_at', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
-    genres = db.Column(db.ARRAY(db.String), nullable=False) #db.Column(db.String(120), nullable=False)
+    genres = db.Column(StringList, nullable=False) #db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120))
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
@@ -16,21 +34,35 @@ class Venue(db.Model):
     seeking_description = db.Column(db.String(400))
     image_link = db.Column(db.String(500))
     shows = db.relationship('Show', backref='venue', lazy=True)
+    # Normalized copy of `genres`, kept in sync on flush, for lookups by genre.
+    genre_links = db.relationship('Genre', secondary='venue_genre', lazy=True)
     
     upcoming_shows_count = db.Column(db.Integer, default=0)
     past_shows_count = db.Column(db.Integer, default=0)    
+
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=utcnow())
     
     def __repr__(self):
       return f'<Venue {self.id} {self.name}>'
 
     # [Done] TODO: implement any missing fields, as a database migration using Flask-Migrate 
 
+# Prefix lookups for autocomplete filter on lower(name) LIKE 'prefix%'.
+db.Index('ix_venue_name_lower', db.func.lower(Venue.name).label('name_lower'),
+         postgresql_ops={'name_lower': 'text_pattern_ops'})
+
 class Artist(db.Model):
     __tablename__ = 'artist'
+    __table_args__ = (
+        # /artists pages through artists in (name, id) order.
+        db.Index('ix_artist_name_id', 'name', 'id'),
+        db.Index('ix_artist_updated_at', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String())
-    genres = db.Column(db.ARRAY(db.String), nullable=False) #db.Column(db.String(120), nullable=False)
+    genres = db.Column(StringList, nullable=False) #db.Column(db.String(120), nullable=False)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
@@ -40,25 +72,260 @@ class Artist(db.Model):
     seeking_description = db.Column(db.String(400))    
     image_link = db.Column(db.String(500))
     shows = db.relationship('Show', backref='artist', lazy=True)
+    genre_links = db.relationship('Genre', secondary='artist_genre', lazy=True)
 
     upcoming_shows_count = db.Column(db.Integer, default=0)
     past_shows_count = db.Column(db.Integer, default=0)       
 
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=utcnow())
+
     def __repr__(self):
       return f'<Artist {self.id} {self.name}>'    
 
     # [Done] TODO: implement any missing fields, as a database migration using Flask-Migrate
 
+db.Index('ix_artist_name_lower', db.func.lower(Artist.name).label('name_lower'),
+         postgresql_ops={'name_lower': 'text_pattern_ops'})
+
+# GIN trigram indexes serve the name searches on PostgreSQL only (migration
+# 2129a436482a), so they are created by DDL there rather than declared on the
+# tables, where every backend would get them. migrations/env.py keeps
+# autogenerate from dropping them.
+POSTGRESQL_ONLY_INDEXES = {'ix_venue_name_trgm': Venue, 'ix_artist_name_trgm': Artist}
+
+for _name, _model in POSTGRESQL_ONLY_INDEXES.items():
+    db.event.listen(_model.__table__, 'after_create', db.DDL(
+        f'CREATE INDEX {_name} ON {_model.__tablename__} USING gin (name gin_trgm_ops)'
+    ).execute_if(dialect='postgresql'))
+
 # [Done] TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
 
 class Show(db.Model):
     __tablename__ = 'show'
+    __table_args__ = (
+        # A venue's or artist's shows, in date order: detail pages, counters
+        # and the freshness checks.
+        db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+        # The /shows listing pages through upcoming shows by (start_time, id),
+        # and the sweeper looks for upcoming shows that have started; past
+        # shows, the bulk of the table, stay out of the index. The predicate
+        # is spelled the way filter(Show.upcoming) renders on each backend, so
+        # the planners can match it.
+        db.Index('ix_show_upcoming_start_time', 'start_time', 'id',
+                 postgresql_where=db.text('upcoming'), sqlite_where=db.text('upcoming = 1')),
+        db.Index('ix_show_updated_at', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), nullable=False)
     artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
     upcoming = db.Column(db.Boolean, nullable=False, default=True)  
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=utcnow())
 
     def __repr__(self):
-      return f'<Show {self.id} {self.venue_id} {self.artist_id} {self.start_time}>'  
\ No newline at end of file
+      return f'<Show {self.id} {self.venue_id} {self.artist_id} {self.start_time}>'  
+
+#----------------------------------------------------------------------------#
+# Genres.
+#----------------------------------------------------------------------------#
+
+# The `genres` arrays stay the display copy; these tables index them, so
+# venues and artists can be found by genre through a unique name lookup and
+# a (genre_id, entity_id) index range instead of scanning every array.
+
+class Genre(db.Model):
+    __tablename__ = 'genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    def __repr__(self):
+      return f'<Genre {self.id} {self.name}>'
+
+venue_genre = db.Table(
+    'venue_genre',
+    db.Column('venue_id', db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_venue_genre_genre_id_venue_id', 'genre_id', 'venue_id'),
+)
+
+artist_genre = db.Table(
+    'artist_genre',
+    db.Column('artist_id', db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_artist_genre_genre_id_artist_id', 'genre_id', 'artist_id'),
+)
+
+GENRE_LINKS = {'venue': venue_genre, 'artist': artist_genre}
+
+# INSERT ... ON CONFLICT, per dialect.
+_INSERT_ON_CONFLICT = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+def genres_named(names):
+    # The Genre rows for `names`, creating any that do not exist yet. Two
+    # transactions can meet the same new name at once: the missing ones are
+    # inserted skipping any another transaction got in first (waiting for
+    # it to commit), and everything is selected again afterwards, so neither
+    # fails on the unique name.
+    names = set(names)
+    genres = Genre.query.filter(Genre.name.in_(names)).all() if names else []
+    missing = names - {genre.name for genre in genres}
+    if not missing:
+        return genres
+    insert = _INSERT_ON_CONFLICT.get(db.engine.dialect.name)
+    if insert is None:
+        for name in sorted(missing):
+            genre = Genre(name=name)
+            db.session.add(genre)
+            genres.append(genre)
+        return genres
+    db.session.execute(insert(Genre.__table__).on_conflict_do_nothing(index_elements=['name']),
+                       [{'name': name} for name in sorted(missing)])
+    return genres + Genre.query.filter(Genre.name.in_(missing)).all()
+
+def link_genres(model, after_id=0):
+    # Links the rows of `model` with an id above `after_id` to their genres,
+    # for writes that bypass the ORM (COPY, bulk INSERT). Rows are assumed to
+    # have no links yet.
+    links = GENRE_LINKS[model.__tablename__]
+    fk = links.c[f'{model.__tablename__}_id']
+    rows = db.session.query(model.id, model.genres).filter(model.id > after_id).all()
+    if not rows:
+        return
+    genres = {genre.name: genre for genre in
+              genres_named({name for _, names in rows for name in names or ()})}
+    db.session.flush()
+    records = [{fk.name: entity_id, 'genre_id': genres[name].id}
+               for entity_id, names in rows for name in set(names or ())]
+    if records:
+        db.session.execute(links.insert(), records)
+
+#----------------------------------------------------------------------------#
+# Deletion stamps.
+#----------------------------------------------------------------------------#
+
+# When rows were last deleted from each table. Inserts and updates move a
+# table's max(updated_at), which its index answers in one lookup, but
+# deletes do not; the list page validators read this row next to it.
+class TableDeletion(db.Model):
+    __tablename__ = 'table_deletion'
+
+    name = db.Column(db.String(64), primary_key=True)
+    deleted_at = db.Column(db.DateTime, nullable=False)
+
+def stamp_deletions(*names):
+    # Records that rows were just deleted from the named tables, in one
+    # statement, as part of the caller's transaction.
+    records = [{'name': name, 'deleted_at': datetime.utcnow()} for name in sorted(names)]
+    insert = _INSERT_ON_CONFLICT.get(db.engine.dialect.name)
+    if insert is None:
+        for record in records:
+            db.session.merge(TableDeletion(**record))
+        return
+    statement = insert(TableDeletion.__table__)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['name'], set_={'deleted_at': statement.excluded.deleted_at}), records)
+
+#----------------------------------------------------------------------------#
+# Database-maintained show counts (PostgreSQL).
+#----------------------------------------------------------------------------#
+
+# Statement-level triggers keep venue/artist upcoming_shows_count and
+# past_shows_count in step with every INSERT, UPDATE and DELETE on show,
+# whether it comes from the app, a bulk COPY or a hand-written query. Each
+# statement applies one aggregate delta per venue and per artist, read from
+# its transition tables.
+
+_SHOW_COUNTS_APPLY = """
+    WITH delta AS ({delta}),
+    venue_delta AS (
+        UPDATE venue SET
+            upcoming_shows_count = coalesce(venue.upcoming_shows_count, 0) + d.upcoming,
+            past_shows_count = coalesce(venue.past_shows_count, 0) + d.past
+        FROM (SELECT venue_id AS id,
+                     sum(CASE WHEN upcoming THEN n ELSE 0 END) AS upcoming,
+                     sum(CASE WHEN upcoming THEN 0 ELSE n END) AS past
+              FROM delta GROUP BY venue_id) AS d
+        WHERE venue.id = d.id AND (d.upcoming <> 0 OR d.past <> 0)
+    )
+    UPDATE artist SET
+        upcoming_shows_count = coalesce(artist.upcoming_shows_count, 0) + d.upcoming,
+        past_shows_count = coalesce(artist.past_shows_count, 0) + d.past
+    FROM (SELECT artist_id AS id,
+                 sum(CASE WHEN upcoming THEN n ELSE 0 END) AS upcoming,
+                 sum(CASE WHEN upcoming THEN 0 ELSE n END) AS past
+          FROM delta GROUP BY artist_id) AS d
+    WHERE artist.id = d.id AND (d.upcoming <> 0 OR d.past <> 0);
+"""
+
+_SHOW_COUNTS_TRIGGERS = {
+    'insert': ('REFERENCING NEW TABLE AS new_shows',
+               'SELECT venue_id, artist_id, upcoming, 1 AS n FROM new_shows'),
+    'update': ('REFERENCING OLD TABLE AS old_shows NEW TABLE AS new_shows',
+               'SELECT venue_id, artist_id, upcoming, 1 AS n FROM new_shows '
+               'UNION ALL SELECT venue_id, artist_id, upcoming, -1 FROM old_shows'),
+    'delete': ('REFERENCING OLD TABLE AS old_shows',
+               'SELECT venue_id, artist_id, upcoming, -1 AS n FROM old_shows'),
+}
+
+SHOW_COUNTS_TRIGGER_NAMES = {f'show_counts_{event}' for event in _SHOW_COUNTS_TRIGGERS}
+
+SHOW_COUNTS_TRIGGERS_DDL = []
+for _event, (_referencing, _delta) in _SHOW_COUNTS_TRIGGERS.items():
+    SHOW_COUNTS_TRIGGERS_DDL += [
+        f"""CREATE OR REPLACE FUNCTION show_counts_on_{_event}() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                {_SHOW_COUNTS_APPLY.format(delta=_delta)}
+                RETURN NULL;
+            END $$""",
+        f"""CREATE TRIGGER show_counts_{_event} AFTER {_event.upper()} ON show
+            {_referencing} FOR EACH STATEMENT
+            EXECUTE PROCEDURE show_counts_on_{_event}()""",
+    ]
+
+# Alternatively, counts can be read from materialized views, refreshed with
+# REFRESH ... CONCURRENTLY (`flask refresh-show-counts`) and selected when
+# SHOW_COUNTS_SOURCE = 'matview'. They classify shows by the same upcoming
+# flag as the counters, and stamp every row with the time of the refresh so
+# that pages showing their counts can tell when they changed.
+
+SHOW_COUNTS_VIEWS_DDL = []
+for _entity in ('venue', 'artist'):
+    SHOW_COUNTS_VIEWS_DDL += [
+        f"""CREATE MATERIALIZED VIEW {_entity}_show_counts AS
+            SELECT {_entity}.id AS {_entity}_id,
+                   count(show.id) FILTER (WHERE show.upcoming) AS upcoming_shows_count,
+                   count(show.id) FILTER (WHERE NOT show.upcoming) AS past_shows_count,
+                   timezone('utc', CURRENT_TIMESTAMP) AS refreshed_at
+            FROM {_entity} LEFT JOIN show ON show.{_entity}_id = {_entity}.id
+            GROUP BY {_entity}.id""",
+        f'CREATE UNIQUE INDEX ix_{_entity}_show_counts_{_entity}_id ON {_entity}_show_counts ({_entity}_id)',
+    ]
+
+for _statement in SHOW_COUNTS_TRIGGERS_DDL + SHOW_COUNTS_VIEWS_DDL:
+    db.event.listen(Show.__table__, 'after_create', db.DDL(_statement).execute_if(dialect='postgresql'))
+
+# The views are mapped on their own MetaData so that create_all and
+# autogenerate leave them alone.
+view_metadata = db.MetaData()
+
+venue_show_counts = db.Table(
+    'venue_show_counts', view_metadata,
+    db.Column('venue_id', db.Integer, primary_key=True),
+    db.Column('upcoming_shows_count', db.Integer),
+    db.Column('past_shows_count', db.Integer),
+    db.Column('refreshed_at', db.DateTime),
+)
+
+artist_show_counts = db.Table(
+    'artist_show_counts', view_metadata,
+    db.Column('artist_id', db.Integer, primary_key=True),
+    db.Column('upcoming_shows_count', db.Integer),
+    db.Column('past_shows_count', db.Integer),
+    db.Column('refreshed_at', db.DateTime),
+)
@@ -0,0 +1,70 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+#----------------------------------------------------------------------------#
+# Keyset pagination.
+#----------------------------------------------------------------------------#
+
+# Pages are addressed by the sort key of their first or last row instead of
+# an OFFSET, so every page is a single index range scan of at most
+# per_page + 1 rows no matter how deep into the table it is.
+
+
+def encode_cursor(values):
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    # Returns the key values of a cursor, or None when it is missing or malformed.
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if len(payload) != len(columns):
+            return None
+        values = []
+        for column, value in zip(columns, payload):
+            if column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            else:
+                value = column.type.python_type(value)
+            values.append(value)
+        return tuple(values)
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset_page(query, columns, per_page, after=None, before=None):
+    # Returns (rows, next_cursor, prev_cursor) for the page that follows the
+    # `after` cursor or precedes the `before` cursor. The rows must expose
+    # every key column under its attribute name (e.g. row.start_time, row.id).
+    key = tuple_(*columns)
+    before_values = decode_cursor(before, columns)
+    after_values = decode_cursor(after, columns)
+
+    if before_values:
+        rows = query.filter(key < tuple_(*before_values)) \
+            .order_by(*[column.desc() for column in columns]) \
+            .limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        prev_cursor = _row_cursor(rows[0], columns) if has_more else None
+        next_cursor = _row_cursor(rows[-1], columns) if rows else None
+    else:
+        if after_values:
+            query = query.filter(key > tuple_(*after_values))
+        rows = query.order_by(*columns).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        next_cursor = _row_cursor(rows[-1], columns) if has_more else None
+        prev_cursor = _row_cursor(rows[0], columns) if after_values and rows else None
+
+    return rows, next_cursor, prev_cursor
+
+
+def _row_cursor(row, columns):
+    return encode_cursor([getattr(row, column.key) for column in columns])
@@ -2,3 +2,39 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// type-ahead: fills the <datalist> of every input[data-autocomplete] with
+// name matches from /api/autocomplete while the user types. Pickers (inputs
+// with data-autocomplete-target) list each match as "Name (#id)" and copy
+// the id of the one picked into the target input.
+var PICKED_ID = /\(#(\d+)\)$/;
+
+document.addEventListener('DOMContentLoaded', function() {
+  var inputs = document.querySelectorAll('input[data-autocomplete]');
+  Array.prototype.forEach.call(inputs, function(input) {
+    var list = document.getElementById(input.getAttribute('list'));
+    var target = document.getElementById(input.getAttribute('data-autocomplete-target'));
+    var timer = null;
+    input.addEventListener('input', function() {
+      if (target) {
+        var picked = PICKED_ID.exec(input.value);
+        target.value = picked ? picked[1] : '';
+        if (picked) { return; }
+      }
+      clearTimeout(timer);
+      timer = setTimeout(function() {
+        var q = input.value.trim();
+        if (!q) { list.innerHTML = ''; return; }
+        var url = '/api/autocomplete?type=' + input.getAttribute('data-autocomplete') + '&q=' + encodeURIComponent(q);
+        fetch(url).then(function(response) { return response.json(); }).then(function(matches) {
+          list.innerHTML = '';
+          matches.forEach(function(match) {
+            var option = document.createElement('option');
+            option.value = target ? match.name + ' (#' + match.id + ')' : match.name;
+            list.appendChild(option);
+          });
+        });
+      }, 100);
+    });
+  });
+});
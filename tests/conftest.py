@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# The app reads its database URL when it is imported, so point it at a
+# scratch database first: a temporary SQLite file, or the empty database
+# FYYUR_TEST_DATABASE_URL names (e.g. a throwaway PostgreSQL one). Every
+# table is emptied after each test and dropped at the end of the session.
+SCRATCH_DIR = tempfile.mkdtemp(prefix='fyyur-tests-')
+os.environ['FYYUR_DATABASE_URL'] = os.environ.get(
+    'FYYUR_TEST_DATABASE_URL', 'sqlite:///' + os.path.join(SCRATCH_DIR, 'primary.db'))
+os.environ.pop('FYYUR_REPLICA_DATABASE_URL', None)
+os.environ.setdefault('FYYUR_SECRET_KEY', 'tests')
+
+from app import app as fyyur_app, db, venue_page_cache, artist_page_cache, autocomplete_cache  # noqa: E402
+from models import view_metadata  # noqa: E402
+
+
+def _drop_views(connection):
+    # The PostgreSQL show count views depend on the tables.
+    if connection.dialect.name == 'postgresql':
+        for view in view_metadata.tables:
+            connection.exec_driver_sql(f'DROP MATERIALIZED VIEW IF EXISTS {view}')
+
+
+@pytest.fixture(scope='session')
+def app():
+    fyyur_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with fyyur_app.app_context():
+        db.create_all()
+    yield fyyur_app
+    with fyyur_app.app_context():
+        db.session.remove()
+        with db.engine.begin() as connection:
+            _drop_views(connection)
+        db.drop_all()
+    shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def database(app):
+    # Yields the db inside an app context, and empties every table and the
+    # in-process caches afterwards.
+    with app.app_context():
+        yield db
+        db.session.remove()
+        with db.engine.begin() as connection:
+            for table in reversed(db.metadata.sorted_tables):
+                connection.execute(table.delete())
+    for cache in (venue_page_cache, artist_page_cache, autocomplete_cache):
+        cache.clear()
+
+
+@pytest.fixture
+def client(app, database):
+    return app.test_client()
+
+
+class StatementRecorder(object):
+    # Records every SQL statement sent to any engine while active.
+
+    def __init__(self):
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(Engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(Engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((conn.engine.url, statement))
+
+
+@pytest.fixture
+def record_statements():
+    # A context manager recording the statements run inside it.
+    return StatementRecorder
@@ -0,0 +1,40 @@
+import json
+from datetime import datetime, timedelta
+
+from models import Venue, Artist, Show
+
+
+def test_api_shows_filters_by_artist_genre(client, database):
+    venue = Venue(name='API Hall', city='San Francisco', state='CA', genres=['Jazz'])
+    jazz = Artist(name='Jazz Artist', city='San Francisco', state='CA', genres=['Jazz'])
+    folk = Artist(name='Folk Artist', city='San Francisco', state='CA', genres=['Folk', 'Blues'])
+    start = datetime.now() + timedelta(days=1)
+    database.session.add_all([
+        Show(venue=venue, artist=jazz, start_time=start, upcoming=True),
+        Show(venue=venue, artist=folk, start_time=start + timedelta(hours=1), upcoming=True),
+    ])
+    database.session.commit()
+
+    for genre, artists in [('Jazz', ['Jazz Artist']), ('Blues', ['Folk Artist']), ('Rock', [])]:
+        response = client.get('/api/shows', query_string={'genre': genre, 'format': 'json'})
+        assert response.status_code == 200
+        assert [show['artist_name'] for show in json.loads(response.get_data())] == artists
+
+
+def test_autocomplete_answers_compact_json(client, database):
+    database.session.add_all([
+        Venue(name='Blue Note', city='New York', state='NY', genres=['Jazz']),
+        Venue(name='Blues Café', city='New York', state='NY', genres=['Blues']),
+        Venue(name='Red Room', city='New York', state='NY', genres=['Rock']),
+    ])
+    database.session.commit()
+
+    for _ in range(2):  # Computed, then cached.
+        response = client.get('/api/autocomplete', query_string={'type': 'venue', 'q': 'blue'})
+        assert response.status_code == 200
+        assert response.mimetype == 'application/json'
+        body = response.get_data(as_text=True)
+        assert '\n' not in body and ', ' not in body and ': ' not in body
+        assert [match['name'] for match in json.loads(body)] == ['Blue Note', 'Blues Café']
+
+    assert client.get('/api/autocomplete', query_string={'type': 'venue'}).get_json() == []
@@ -0,0 +1,49 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from app import book_show
+from models import Venue, Artist, Show
+
+THREADS = 8
+BOOKINGS_PER_THREAD = 125
+
+
+def counts_from_shows(database, show_fk, entity_id):
+    # (upcoming, past) counted from the show table itself.
+    return tuple(database.session.query(Show).filter(show_fk == entity_id, Show.upcoming.is_(flag)).count()
+                 for flag in (True, False))
+
+
+def test_concurrent_bookings_keep_the_counters_exact(app, database):
+    venue = Venue(name='Concurrency Hall', city='San Francisco', state='CA', genres=['Jazz'],
+                  upcoming_shows_count=0, past_shows_count=0)
+    artists = [Artist(name=f'Concurrency Artist {i}', city='San Francisco', state='CA', genres=['Jazz'],
+                      upcoming_shows_count=0, past_shows_count=0) for i in range(4)]
+    database.session.add_all([venue] + artists)
+    database.session.commit()
+    venue_id, artist_ids = venue.id, [artist.id for artist in artists]
+    database.session.remove()
+
+    now = datetime.now()
+    start = threading.Barrier(THREADS)
+
+    def book(thread):
+        # Each thread books through its own app context, session and
+        # connection, all at the same venue and half of them in the past,
+        # so a lost update would leave a counter short.
+        start.wait()
+        for i in range(thread * BOOKINGS_PER_THREAD, (thread + 1) * BOOKINGS_PER_THREAD):
+            days = timedelta(days=1 + i)
+            with app.app_context():
+                book_show(artist_ids[i % len(artist_ids)], venue_id, now + days if i % 2 else now - days)
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(book, range(THREADS)))
+
+    assert database.session.query(Show).count() == THREADS * BOOKINGS_PER_THREAD
+    for model, show_fk, entity_id in [(Venue, Show.venue_id, venue_id)] + \
+            [(Artist, Show.artist_id, artist_id) for artist_id in artist_ids]:
+        entity = database.session.get(model, entity_id)
+        assert (entity.upcoming_shows_count, entity.past_shows_count) == \
+            counts_from_shows(database, show_fk, entity_id), entity
@@ -0,0 +1,26 @@
+from compress import CompressionMiddleware
+
+
+def compressed_headers(vary):
+    # Response headers of a compressible body whose app set `vary`.
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/html'), ('Vary', vary)])
+        return [b'x' * 4096]
+
+    headers = {}
+    middleware = CompressionMiddleware(app)
+    b''.join(middleware({'REQUEST_METHOD': 'GET', 'HTTP_ACCEPT_ENCODING': 'gzip'},
+                        lambda status, response_headers, exc_info=None: headers.update(response_headers)))
+    return headers
+
+
+def test_vary_names_accept_encoding_once():
+    assert compressed_headers('Cookie')['Vary'] == 'Cookie, Accept-Encoding'
+    assert compressed_headers('Cookie, accept-encoding')['Vary'] == 'Cookie, accept-encoding'
+    assert compressed_headers('*')['Vary'] == '*'
+
+
+def test_scripts_are_compressed(client):
+    response = client.get('/static/js/script.js', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers.get_all('Vary') == ['Accept-Encoding']
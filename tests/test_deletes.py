@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from app import book_show
+from models import Venue, Artist, Show, GENRE_LINKS
+
+
+def add(database, model, name, **fields):
+    entity = model(name=name, city='San Francisco', state='CA', genres=['Jazz', 'Folk'],
+                   upcoming_shows_count=0, past_shows_count=0, **fields)
+    database.session.add(entity)
+    database.session.commit()
+    return entity.id
+
+
+def counters(database, model, entity_id):
+    entity = database.session.get(model, entity_id)
+    database.session.refresh(entity)
+    return entity.upcoming_shows_count, entity.past_shows_count
+
+
+def links(database, model, entity_id):
+    table = GENRE_LINKS[model.__tablename__]
+    return database.session.query(table).filter(table.c[f'{model.__tablename__}_id'] == entity_id).count()
+
+
+def test_deleting_venues_and_artists_updates_their_counterparts(client, database):
+    doomed_venue = add(database, Venue, 'Doomed Hall', address='1 Main St')
+    kept_venue = add(database, Venue, 'Kept Hall', address='2 Main St')
+    doomed_artist = add(database, Artist, 'Doomed Artist')
+    kept_artist = add(database, Artist, 'Kept Artist')
+    now = datetime.now()
+    for artist_id, venue_id, days in [
+        (kept_artist, doomed_venue, 1), (kept_artist, doomed_venue, 2), (kept_artist, doomed_venue, -1),
+        (kept_artist, kept_venue, 3), (doomed_artist, doomed_venue, 4),
+        (doomed_artist, kept_venue, 5), (doomed_artist, kept_venue, -2),
+    ]:
+        book_show(artist_id, venue_id, now + timedelta(days=days))
+    assert counters(database, Artist, kept_artist) == (3, 1)
+    assert links(database, Venue, doomed_venue) == 2
+
+    response = client.delete(f'/venues/{doomed_venue}')
+    assert response.status_code == 204
+    assert database.session.get(Venue, doomed_venue) is None
+    assert database.session.query(Show).filter(Show.venue_id == doomed_venue).count() == 0
+    assert links(database, Venue, doomed_venue) == 0
+    assert counters(database, Artist, kept_artist) == (1, 0)
+    assert counters(database, Artist, doomed_artist) == (1, 1)
+
+    response = client.delete(f'/artists/{doomed_artist}')
+    assert response.status_code == 204
+    assert database.session.get(Artist, doomed_artist) is None
+    assert links(database, Artist, doomed_artist) == 0
+    assert counters(database, Venue, kept_venue) == (1, 0)
+    assert links(database, Venue, kept_venue) == 2
+
+    for url in (f'/venues/{doomed_venue}', f'/artists/{doomed_artist}'):
+        response = client.delete(url)
+        assert response.status_code == 404
+        assert 'error' in response.get_json()
@@ -0,0 +1,29 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from models import Venue, Genre
+
+
+def test_a_genre_created_concurrently_is_reused(database):
+    # Another transaction commits the same new genre right after this one
+    # found it missing, as when two requests name it at once.
+    raced = []
+
+    def race(conn, cursor, statement, parameters, context, executemany):
+        if not raced and statement.lstrip().upper().startswith('SELECT') and 'FROM genre' in statement:
+            raced.append(True)
+            with database.engine.begin() as other:
+                other.execute(Genre.__table__.insert(), {'name': 'Zydeco'})
+
+    event.listen(Engine, 'after_cursor_execute', race)
+    try:
+        database.session.add(Venue(name='Race Hall', city='San Francisco', state='CA',
+                                   genres=['Jazz', 'Zydeco']))
+        database.session.commit()
+    finally:
+        event.remove(Engine, 'after_cursor_execute', race)
+
+    assert raced
+    assert database.session.query(Genre).filter_by(name='Zydeco').count() == 1
+    venue = database.session.query(Venue).filter_by(name='Race Hall').one()
+    assert sorted(genre.name for genre in venue.genre_links) == ['Jazz', 'Zydeco']
@@ -0,0 +1,64 @@
+import pytest
+
+from models import Venue
+
+VENUE_FORM = {
+    'name': 'Primary Hall', 'city': 'San Francisco', 'state': 'CA', 'address': '1 Main St',
+    'phone': '415-555-0100', 'genres': ['Jazz'], 'facebook_link': 'https://www.facebook.com/primary',
+    'image_link': 'https://images.example.com/primary.jpg', 'website_link': 'https://primary.example.com',
+    'seeking_description': '',
+}
+
+
+@pytest.fixture
+def replica(app, database, tmp_path):
+    # A second SQLite file standing in for the read replica. Replication is
+    # left out on purpose: what a page shows tells which database it read.
+    app.config['SQLALCHEMY_BINDS'] = {'replica': f'sqlite:///{tmp_path / "replica.db"}'}
+    engine = database.get_engine(app, bind='replica')
+    database.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(Venue.__table__.insert(), {
+            'name': 'Replica Hall', 'city': 'San Francisco', 'state': 'CA', 'genres': ['Jazz']})
+    yield engine
+    app.config['SQLALCHEMY_BINDS'] = {}
+    engine.dispose()
+
+
+def get_venues(client, record_statements):
+    # (page, databases the request read from)
+    with record_statements() as recorder:
+        page = client.get('/venues').get_data(as_text=True)
+    return page, {url for url, _ in recorder.statements}
+
+
+def test_reads_go_to_the_replica(client, database, replica, record_statements):
+    page, urls = get_venues(client, record_statements)
+    assert urls == {replica.url}
+    assert 'Replica Hall' in page
+
+
+def test_writes_go_to_the_primary_and_its_author_reads_it_for_a_while(
+        client, database, replica, record_statements):
+    with record_statements() as recorder:
+        response = client.post('/venues/create', data=VENUE_FORM)
+    assert response.status_code == 200
+    assert {url for url, _ in recorder.statements} == {database.engine.url}
+
+    # Right after writing, the client reads its own write from the primary.
+    page, urls = get_venues(client, record_statements)
+    assert urls == {database.engine.url}
+    assert 'Primary Hall' in page and 'Replica Hall' not in page
+
+    # Once the sticky window is over, it is back on the replica.
+    with client.session_transaction() as session:
+        session['read_primary_until'] = 0
+    page, urls = get_venues(client, record_statements)
+    assert urls == {replica.url}
+    assert 'Replica Hall' in page
+
+
+def test_other_clients_keep_reading_the_replica(app, client, database, replica, record_statements):
+    client.post('/venues/create', data=VENUE_FORM)
+    page, urls = get_venues(app.test_client(), record_statements)
+    assert urls == {replica.url}
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+from app import book_show, sweep_shows
+from models import Venue, Artist, Show
+
+
+def test_sweeping_in_batches_moves_the_counters(database):
+    venues = [Venue(name=f'Sweep Hall {i}', city='San Francisco', state='CA', genres=['Jazz'],
+                    upcoming_shows_count=0, past_shows_count=0) for i in range(3)]
+    artists = [Artist(name=f'Sweep Artist {i}', city='San Francisco', state='CA', genres=['Jazz'],
+                      upcoming_shows_count=0, past_shows_count=0) for i in range(4)]
+    database.session.add_all(venues + artists)
+    database.session.commit()
+    venue_ids, artist_ids = [venue.id for venue in venues], [artist.id for artist in artists]
+
+    # 30 upcoming shows spread unevenly over the venues and artists, then
+    # two thirds of them moved into the past behind the counters' back, as
+    # time passing does; plus a few already past.
+    now = datetime.now()
+    for i in range(30):
+        book_show(artist_ids[i % 4], venue_ids[i % 3 if i % 5 else 0], now + timedelta(days=1 + i))
+    for i in range(5):
+        book_show(artist_ids[i % 4], venue_ids[i % 3], now - timedelta(days=1 + i))
+    due = [show_id for show_id, in database.session.query(Show.id)
+           .filter(Show.upcoming).order_by(Show.id).limit(20)]
+    database.session.query(Show).filter(Show.id.in_(due)) \
+        .update({Show.start_time: now - timedelta(hours=1)}, synchronize_session=False)
+    database.session.commit()
+
+    assert sweep_shows(batch_size=7) == 20
+    assert sweep_shows(batch_size=7) == 0
+
+    database.session.expire_all()
+    assert database.session.query(Show).filter(Show.upcoming).count() == 10
+    for model, show_fk, entity_ids in ((Venue, Show.venue_id, venue_ids), (Artist, Show.artist_id, artist_ids)):
+        for entity_id in entity_ids:
+            entity = database.session.get(model, entity_id)
+            assert (entity.upcoming_shows_count, entity.past_shows_count) == tuple(
+                database.session.query(Show).filter(show_fk == entity_id, Show.upcoming.is_(flag)).count()
+                for flag in (True, False)), entity
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+from models import Venue, Artist, Show
+
+AREAS = [('San Francisco', 'CA'), ('New York', 'NY'), ('Austin', 'TX')]
+
+
+def add_venues(db, count, start=0):
+    # `count` venues spread over AREAS, each with one upcoming and one past show.
+    artist = Artist(name='Listing Artist', city='Austin', state='TX', genres=['Jazz'])
+    db.session.add(artist)
+    now = datetime.now()
+    for i in range(start, start + count):
+        city, state = AREAS[i % len(AREAS)]
+        venue = Venue(name=f'Venue {i}', city=city, state=state, address=f'{i} Main St',
+                      genres=['Jazz'], upcoming_shows_count=1, past_shows_count=1)
+        db.session.add(venue)
+        db.session.add_all([
+            Show(venue=venue, artist=artist, start_time=now + timedelta(days=i + 1), upcoming=True),
+            Show(venue=venue, artist=artist, start_time=now - timedelta(days=i + 1), upcoming=False),
+        ])
+    db.session.commit()
+
+
+def test_venues_runs_a_constant_number_of_statements(client, database, record_statements):
+    counts = {}
+    total = 0
+    for count in (1, 30):
+        add_venues(database, count - total, start=total)
+        total = count
+        with record_statements() as recorder:
+            response = client.get('/venues')
+        assert response.status_code == 200
+        assert response.get_data(as_text=True).count('href="/venues/') == count
+        counts[count] = len(recorder.statements)
+
+    assert counts[1] == counts[30], counts
+
+
+def test_venues_groups_venues_by_area(client, database):
+    add_venues(database, 6)
+    page = client.get('/venues').get_data(as_text=True)
+    for city, _ in AREAS:
+        assert page.count(city) == 1